@@ -0,0 +1,66 @@
+"""Field writes: pypdf's appearance generation vs. cached appearance plans.
+
+Run from the repository root:  python benchmarks/bench_appearance.py
+
+Times write_fields() on fresh template copies for one full batch of each
+course, first letting pypdf build every appearance, then drawing plain
+text widgets from the template's cached plans (see appearance.py). Also
+reports the one-time cost of building the plans and how many of each
+batch's widgets fell back to pypdf.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_roster
+from lss_forms.appearance import appearance_plans, can_draw
+from lss_forms.engine import available_courses, build_data_map, load_profile
+from lss_forms.fields import field_index, write_fields
+from lss_forms.roster import load_records
+from lss_forms.templates import clone_template
+
+RUNS = 10
+
+
+def time_writes(template, data_map, plans):
+    writers = [clone_template(template) for _ in range(RUNS)]
+    index = field_index(template)
+    start = time.perf_counter()
+    for writer in writers:
+        write_fields(writer, index, data_map, plans)
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, 13)
+    records = load_records(path)
+
+print(f"{'course':18} {'pypdf':>9} {'planned':>9} {'speed-up':>9} {'plans built':>12} {'fallbacks':>10}")
+for course in available_courses():
+    profile = load_profile(course)
+    template = profile["template"]
+    if not os.path.exists(template):
+        print(f"SKIP: {template} not found")
+        continue
+    data_map = build_data_map(profile, records[: profile["batch_size"]])
+    field_index(template)
+    start = time.perf_counter()
+    plans = appearance_plans(template)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    widgets = fallbacks = 0
+    for name, value in data_map.items():
+        for page_index, annot_indexes in field_index(template).get(name, ()):
+            for annot_index in annot_indexes:
+                widgets += 1
+                plan = plans.get((page_index, annot_index))
+                fallbacks += plan is None or not can_draw(plan, value)
+
+    pypdf_ms = time_writes(template, data_map, None)
+    planned_ms = time_writes(template, data_map, plans)
+    print(f"{course:18} {pypdf_ms:7.1f}ms {planned_ms:7.1f}ms {pypdf_ms / planned_ms:8.1f}x "
+          f"{build_ms:10.0f}ms {fallbacks:4}/{widgets}")
@@ -0,0 +1,62 @@
+"""Serializing a filled batch: full write vs. template bytes plus an update.
+
+Run from the repository root:  python benchmarks/bench_append.py
+
+For one full batch of each course, times writer.write() of the whole
+document (filled as a normal run fills it) against
+increment.appended_pdf(), which copies the template file (memory-mapped)
+and appends only the objects the batch changed, and compares output
+sizes.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_roster
+from lss_forms.engine import available_courses, fill_writer, load_profile
+from lss_forms.increment import appended_pdf, changed_objects
+from lss_forms.roster import load_records
+from lss_forms.templates import load_template
+
+RUNS = 10
+
+
+def full_write(writer):
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def time_ms(function, *args):
+    result = function(*args)  # warm-up (and the first mmap)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        function(*args)
+    return result, (time.perf_counter() - start) / RUNS * 1000
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, 13)
+    records = load_records(path)
+
+print(f"{'course':18} {'full write':>11} {'appended':>9} {'speed-up':>9} "
+      f"{'full size':>10} {'appended size':>14} {'objects':>8}")
+for course in available_courses():
+    profile = load_profile(course)
+    template = profile["template"]
+    if not os.path.exists(template):
+        print(f"SKIP: {template} not found")
+        continue
+    batch = records[: profile["batch_size"]]
+    full, full_ms = time_ms(full_write, fill_writer(profile, batch))
+    writer = fill_writer(profile, batch, append=True)
+    appended, appended_ms = time_ms(appended_pdf, writer, template)
+    update_kb = (len(appended) - os.path.getsize(template)) // 1024
+    objects = len(changed_objects(writer, load_template(template, incremental=True)))
+    print(f"{course:18} {full_ms:9.1f}ms {appended_ms:7.1f}ms {full_ms / appended_ms:8.1f}x "
+          f"{len(full) // 1024:8}KB {len(appended) // 1024:6}KB (+{update_kb}KB) {objects:8}")
@@ -0,0 +1,51 @@
+"""Checking a roster (--check) vs. generating its sheets to find the problems.
+
+Run from the repository root:  python benchmarks/bench_check.py [rows]
+
+For a synthetic roster (default 300 rows), times validate.check_roster()
+over every course, cold (field inventories read from field_inventory/)
+and warm, against filling every batch in memory with engine.batch_pdf(),
+which is what finding the same problems took before (roster parsing
+included: snapshots are off, as check_roster() always parses).
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_roster
+from lss_forms import inventory, roster
+from lss_forms.engine import available_courses, batch_pdf, iter_jobs, load_profile
+from lss_forms.validate import check_roster
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+roster.ROSTER_SNAPSHOTS = False
+courses = [course for course in available_courses() if os.path.exists(load_profile(course)["template"])]
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, rows)
+
+    inventory._INVENTORIES.clear()
+    start = time.perf_counter()
+    issues, notes = check_roster(courses, path)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    check_roster(courses, path)
+    warm = time.perf_counter() - start
+
+    profiles = [load_profile(course) for course in courses]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheets = sum(1 for profile, batch, _ in iter_jobs(profiles, [roster.load_records(path)])
+                     if batch_pdf(profile, batch) is not None)
+    fill = time.perf_counter() - start
+
+print(f"{rows} rows, {len(courses)} course(s): {sheets} sheets, {len(issues)} issue(s)")
+print(f"  {'check, cold':16} {cold * 1000:9.1f}ms")
+print(f"  {'check, warm':16} {warm * 1000:9.1f}ms")
+print(f"  {'fill every sheet':16} {fill * 1000:9.1f}ms  ({fill / warm:.0f}x the warm check)")
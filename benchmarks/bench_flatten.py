@@ -0,0 +1,81 @@
+"""Flattened vs. live-form output: file size, open time and render time.
+
+Run from the repository root:  python benchmarks/bench_flatten.py
+
+Render times need pypdfium2 (pip install pypdfium2); without it only size
+and pypdf open times are reported. The live form is rendered with its
+form fields drawn, as a viewer shows it.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader
+
+from benchmarks.synthetic import write_roster
+from lss_forms.engine import available_courses, fill_writer, load_profile
+from lss_forms.flatten import flatten_writer
+from lss_forms.roster import normalize_roster, read_roster
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+RUNS = 5
+
+
+def to_bytes(writer):
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def open_ms(data):
+    # Parse every page and its annotations, as a viewer has to on open.
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        reader = PdfReader(io.BytesIO(data))
+        for page in reader.pages:
+            page.get("/Annots")
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def render_ms(data):
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        pdf = pypdfium2.PdfDocument(data)
+        pdf.init_forms()
+        for page in pdf:
+            page.render(scale=1.5, may_draw_forms=True)
+        pdf.close()
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, 13)
+    records = normalize_roster(read_roster(path))
+
+print(f"{'course':18} {'size':>16} {'flatten':>8} {'pypdf open':>17} {'render':>19}")
+for course in available_courses():
+    profile = load_profile(course)
+    if not os.path.exists(profile["template"]):
+        print(f"SKIP: {profile['template']} not found")
+        continue
+    live = to_bytes(fill_writer(profile, records))
+    writer = fill_writer(profile, records)
+    start = time.perf_counter()
+    flatten_writer(writer)
+    flatten_ms = (time.perf_counter() - start) * 1000
+    flat = to_bytes(writer)
+
+    render = "n/a (no pypdfium2)"
+    if pypdfium2 is not None:
+        render = f"{render_ms(live):6.0f} -> {render_ms(flat):4.0f}ms"
+    print(f"{course:18} {len(live) // 1024:5}KB -> {len(flat) // 1024:4}KB {flatten_ms:6.0f}ms "
+          f"{open_ms(live):6.0f} -> {open_ms(flat):4.0f}ms {render:>19}")
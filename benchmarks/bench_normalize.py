@@ -0,0 +1,75 @@
+"""Roster normalization: per-row iterrows path vs. the column-wise pass.
+
+Run from the repository root:  python benchmarks/bench_normalize.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.synthetic import write_roster
+from lss_forms.roster import normalize_roster, read_roster
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+
+def clean_name(raw_name):
+    if pd.isna(raw_name): return ""
+    raw_name = str(raw_name)
+    if "," in raw_name:
+        parts = raw_name.split(",")
+        if len(parts) >= 2:
+            return f"{parts[1].strip()} {parts[0].strip()}"
+    return raw_name
+
+
+def normalize_per_row(df):
+    # What fill_pdf used to do for every candidate, in every script.
+    records = []
+    for idx, row in df.iterrows():
+        raw_dob = row.get("DateOfBirth", "")
+        dd, mm, yy = "", "", ""
+        if pd.notna(raw_dob):
+            try:
+                dt = pd.to_datetime(raw_dob, dayfirst=True)
+                dd = str(dt.day).zfill(2)
+                mm = str(dt.month).zfill(2)
+                yy = str(dt.year)[-2:]
+            except: pass
+        records.append({
+            "name": clean_name(row.get("AttendeeName", "")),
+            "addr": str(row.get("Street", "")),
+            "city": str(row.get("City", "")),
+            "zip": str(row.get("PostalCode", "")),
+            "email": str(row.get("E-mail", "")),
+            "phone": str(row.get("AttendeePhone", "")),
+            "dd": dd, "mm": mm, "yy": yy,
+        })
+    return records
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, ROWS)
+    df = read_roster(path)
+
+print(f"Synthetic roster: {ROWS} rows")
+start = time.perf_counter()
+columnwise = normalize_roster(df)
+columnwise_s = time.perf_counter() - start
+print(f"  column-wise normalize_roster: {columnwise_s:8.2f}s")
+
+start = time.perf_counter()
+per_row = normalize_per_row(df)
+per_row_s = time.perf_counter() - start
+print(f"  per-row iterrows + to_datetime: {per_row_s:6.2f}s  ({per_row_s / columnwise_s:.0f}x slower)")
+
+same = all(
+    {key: record[key] for key in expected} == expected
+    for expected, record in zip(per_row, columnwise)
+)
+print(f"  identical output: {same and len(per_row) == len(columnwise)}")
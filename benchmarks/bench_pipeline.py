@@ -0,0 +1,111 @@
+"""Throughput of the serial batch loop vs. the read/fill/write/save pipeline.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py                 # 300 rows, every course
+    python benchmarks/bench_pipeline.py 5000 --course sfa --processes 2
+    python benchmarks/bench_pipeline.py --save-delay 100  # e.g. a network share
+
+Fills every batch of a synthetic roster (streamed in chunks, as with
+--stream) into a temporary folder and into a zip archive, once with
+engine.fill_jobs() and once with pipeline.fill_jobs_async() on threads,
+plus on a process pool when --processes is given. Each run starts from
+warm template caches so that only the batch loop is compared.
+
+pypdf holds the GIL, so on threads the pipeline only wins back time the
+batch loop spends waiting. --save-delay adds that much sleep to every
+sheet written, to stand in for a slow disk or a network share.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_roster
+from lss_forms.appearance import appearance_plans
+from lss_forms.engine import (available_courses, fill_jobs, iter_jobs, load_profile,
+                              stream_chunk_rows)
+from lss_forms.fields import field_index
+from lss_forms.pipeline import fill_jobs_async
+from lss_forms.roster import stream_records
+from lss_forms.sinks import FolderSink, ZipSink
+
+
+class SlowSink:
+    """Wraps a sink so that every write also waits delay seconds."""
+
+    def __init__(self, sink, delay):
+        self.sink = sink
+        self.delay = delay
+
+    def write(self, name, data):
+        time.sleep(self.delay)
+        return self.sink.write(name, data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sink.close()
+
+
+def run(fill, profiles, roster, sink_kind, tmp, delay):
+    jobs = iter_jobs(profiles, stream_records(roster, stream_chunk_rows(profiles)))
+    out = os.path.join(tmp, sink_kind)
+    sink = FolderSink(out) if sink_kind == "folder" else ZipSink(out + ".zip")
+    if delay:
+        sink = SlowSink(sink, delay)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), sink:
+        written = fill(jobs, sink)
+    return len(written), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="?", type=int, default=300, help="roster rows (default: 300)")
+    parser.add_argument("--course", action="append", help="course(s) to run (default: every profile)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="also time the pipeline with this many fill processes")
+    parser.add_argument("--save-delay", type=float, default=0.0, metavar="MS",
+                        help="simulated latency of every sheet write (default: 0)")
+    args = parser.parse_args()
+
+    profiles = [load_profile(course) for course in args.course or available_courses()]
+    profiles = [profile for profile in profiles if os.path.exists(profile["template"])]
+    templates = sorted({profile["template"] for profile in profiles})
+    for template in templates:
+        field_index(template)
+        appearance_plans(template)
+
+    modes = [
+        ("serial", fill_jobs),
+        ("pipeline, threads", fill_jobs_async),
+    ]
+    if args.processes:
+        modes.append((f"pipeline, {args.processes} proc",
+                      lambda jobs, sink: fill_jobs_async(jobs, sink, processes=args.processes,
+                                                         templates=templates)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        roster = os.path.join(tmp, "roster.csv")
+        write_roster(roster, args.rows)
+        print(f"{args.rows} rows, {len(profiles)} course(s), {os.cpu_count()} CPU(s), "
+              f"{args.save_delay:g}ms per save")
+        print(f"  {'sink':7} {'mode':22} {'sheets':>7} {'wall':>8} {'sheets/s':>9} {'vs serial':>10}")
+        for sink_kind in ("folder", "zip"):
+            serial = None
+            for label, fill in modes:
+                sheets, wall = run(fill, profiles, roster, sink_kind, tmp, args.save_delay / 1000)
+                serial = serial or wall
+                print(f"  {sink_kind:7} {label:22} {sheets:7} {wall:7.2f}s {sheets / wall:9.1f} "
+                      f"{serial / wall:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Fill service under load: one 13-candidate Bronze Cross batch per request.
+
+Run from the repository root:  python benchmarks/bench_service.py [workers]
+
+Starts the service on a local port and fires the same upload from 1, 2, 4
+and 8 client threads at once, reporting request latency and throughput.
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server
+
+from benchmarks.synthetic import write_roster
+from lss_forms.service import create_app
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else None
+REQUESTS_PER_CLIENT = 4
+BOUNDARY = "lss-bench-boundary"
+
+
+def multipart(roster_bytes):
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="course"\r\n\r\nbronze_cross\r\n'
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="roster"; filename="roster.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + roster_bytes + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def post(url, body):
+    start = time.perf_counter()
+    request = urllib.request.Request(url, data=body, headers={
+        "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+    })
+    with urllib.request.urlopen(request) as response:
+        data = response.read()
+    elapsed = time.perf_counter() - start
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ["Bronze_Cross_Test_Sheet_1.pdf"], archive.namelist()
+    return elapsed
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, 13)
+    with open(path, "rb") as f:
+        body = multipart(f.read())
+
+start = time.perf_counter()
+app = create_app(WORKERS)
+print(f"Start-up with every template preloaded: {time.perf_counter() - start:.2f}s "
+      f"({app.extensions['lss_pool']._max_workers} worker(s))")
+server = make_server("127.0.0.1", 0, app, threaded=True)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_port}/fill"
+
+post(url, body)  # warm-up
+print(f"{'clients':>7} {'requests':>8} {'p50':>8} {'p95':>8} {'throughput':>14}")
+for clients in (1, 2, 4, 8):
+    total = clients * REQUESTS_PER_CLIENT
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = sorted(pool.map(lambda _: post(url, body), range(total)))
+    wall = time.perf_counter() - start
+    p95 = latencies[min(total - 1, int(total * 0.95))]
+    print(f"{clients:7} {total:8} {statistics.median(latencies) * 1000:6.0f}ms {p95 * 1000:6.0f}ms "
+          f"{total / wall:8.1f} req/s")
+
+server.shutdown()
+app.extensions["lss_pool"].shutdown()
@@ -0,0 +1,50 @@
+"""Loading a roster: parsing the CSV vs. its columnar snapshot.
+
+Run from the repository root:  python benchmarks/bench_snapshot.py [rows ...]
+
+For synthetic rosters (default 1,000, 10,000 and 100,000 rows) times
+load_records() in a fresh process, as each course script or run pays it:
+with snapshots off (CSV read + normalize, pandas imported past
+LIGHT_ROSTER_BYTES), on a first run (parse + save the snapshot) and on
+every later run (snapshot hit), plus the file sizes.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import write_roster
+
+# Times load_records() in the child, imports it triggers included.
+CHILD = """
+import sys, time
+from lss_forms import roster, snapshot
+roster.ROSTER_SNAPSHOTS = sys.argv[3] == "1"
+snapshot.SNAPSHOT_FOLDER = sys.argv[2]
+start = time.perf_counter()
+records = roster.load_records(sys.argv[1])
+print(time.perf_counter() - start)
+"""
+
+
+def timed(roster_path, folder, snapshots):
+    result = subprocess.run([sys.executable, "-c", CHILD, roster_path, folder, "1" if snapshots else "0"],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    return float(result.stdout.split()[-1])
+
+
+sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+print(f"{'rows':>8} {'csv':>9} {'snapshot':>9} {'parse':>9} {'first run':>10} {'later runs':>11} {'speed-up':>9}")
+for rows in sizes:
+    with tempfile.TemporaryDirectory() as tmp:
+        roster_path, folder = os.path.join(tmp, "roster.csv"), os.path.join(tmp, "cache")
+        write_roster(roster_path, rows)
+        parse = timed(roster_path, folder, False)
+        first = timed(roster_path, folder, True)
+        later = min(timed(roster_path, folder, True) for _ in range(3))
+        snapshot_size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+        print(f"{rows:8} {os.path.getsize(roster_path) / 1e6:7.2f}MB {snapshot_size / 1e6:7.2f}MB "
+              f"{parse * 1000:7.0f}ms {first * 1000:8.0f}ms {later * 1000:9.0f}ms {parse / later:8.1f}x")
@@ -0,0 +1,175 @@
+"""Stage-by-stage timings and peak memory for every course, per roster size.
+
+Run from the repository root:
+
+    python benchmarks/bench_stages.py                  # 10, 1000 and 100000 rows
+    python benchmarks/bench_stages.py 10 1000 --json stages.json
+
+For each synthetic roster (roster.csv schema, fixed seed) it times the
+CSV load and normalization once, each on the path roster.load_records
+takes for that size (csv module up to LIGHT_ROSTER_BYTES, pandas past
+it; pandas is imported up front so neither stage pays for the import),
+then for each course's template the one-time template load (parse +
+field index + host variant) and, per batch, the field fill (variant
+copy + candidate data map + widget writes, i.e. engine.fill_writer) and
+serialization to PDF bytes. Large rosters have thousands of batches, so
+at most --batches of them are timed and the course total is projected
+from their mean.
+
+Peak memory is the tracemalloc high-water mark of a second, traced pass of
+each stage (tracing slows Python down, so it is kept out of the timings).
+Save --json output from two revisions and compare them to spot regressions.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas  # noqa: F401 (see the module doc)
+
+from benchmarks.synthetic import write_roster
+from lss_forms import appearance, fields, roster
+from lss_forms.engine import available_courses, fill_writer, load_profile
+from lss_forms.templates import clear_templates
+from lss_forms.variants import clear_variants
+
+SIZES = [10, 1000, 100_000]
+MAX_BATCHES = 20
+
+
+def timed(function, *args):
+    """(result, seconds) of one call."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def peak_mb(function, *args):
+    """Peak traced allocation (MB) while function runs."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def cold_template(profile):
+    # What the first batch of a run pays: parse the PDF, index its fields,
+    # plan its appearances and pre-fill the host block.
+    clear_templates()
+    clear_variants()
+    fields._FIELD_INDEXES.clear()
+    appearance._PLANS.clear()
+    fill(profile, [])
+
+
+def fill(profile, records):
+    return fill_writer(profile, records)
+
+
+def serialize(writer):
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def one_batch(profile, records):
+    serialize(fill(profile, records))
+
+
+def bench_course(profile, records, max_batches):
+    batch_size = profile["batch_size"]
+    batches = math.ceil(len(records) / batch_size)
+    sample = min(batches, max_batches)
+
+    _, template_s = timed(cold_template, profile)
+    template_mb = peak_mb(cold_template, profile)
+
+    fill_times, write_times = [], []
+    for i in range(sample):
+        batch = records[i * batch_size : (i + 1) * batch_size]
+        writer, fill_s = timed(fill, profile, batch)
+        _, write_s = timed(serialize, writer)
+        fill_times.append(fill_s)
+        write_times.append(write_s)
+    batch_mb = peak_mb(one_batch, profile, records[:batch_size])
+
+    fill_ms = statistics.mean(fill_times) * 1000
+    write_ms = statistics.mean(write_times) * 1000
+    return {
+        "template_ms": template_s * 1000,
+        "template_peak_mb": template_mb,
+        "batches": batches,
+        "timed_batches": sample,
+        "fill_ms_per_batch": fill_ms,
+        "write_ms_per_batch": write_ms,
+        "batch_peak_mb": batch_mb,
+        "projected_s": template_s + batches * (fill_ms + write_ms) / 1000,
+    }
+
+
+def bench_size(rows, courses, max_batches):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "roster.csv")
+        write_roster(path, rows)
+        if os.path.getsize(path) <= roster.LIGHT_ROSTER_BYTES:
+            read, normalize = roster.read_rows, roster.normalize_rows
+        else:
+            read, normalize = roster.read_roster, roster.normalize_roster
+        table, load_s = timed(read, path)
+        load_mb = peak_mb(read, path)
+    records, normalize_s = timed(normalize, table)
+    normalize_mb = peak_mb(normalize, table)
+
+    print(f"\n{rows} rows: CSV load {load_s * 1000:.0f}ms (peak {load_mb:.1f}MB), "
+          f"normalize {normalize_s * 1000:.0f}ms (peak {normalize_mb:.1f}MB)")
+    print(f"  {'course':18} {'template':>9} {'fill/batch':>11} {'write/batch':>12} "
+          f"{'batches':>13} {'projected':>10} {'peak tmpl':>10} {'peak batch':>11}")
+    result = {
+        "rows": rows,
+        "csv_load_ms": load_s * 1000, "csv_load_peak_mb": load_mb,
+        "normalize_ms": normalize_s * 1000, "normalize_peak_mb": normalize_mb,
+        "courses": {},
+    }
+    for course in courses:
+        profile = load_profile(course)
+        if not os.path.exists(profile["template"]):
+            print(f"  SKIP: {profile['template']} not found")
+            continue
+        stats = bench_course(profile, records, max_batches)
+        result["courses"][course] = stats
+        batches = f"{stats['timed_batches']}/{stats['batches']}"
+        print(f"  {course:18} {stats['template_ms']:7.0f}ms {stats['fill_ms_per_batch']:9.1f}ms "
+              f"{stats['write_ms_per_batch']:10.1f}ms {batches:>13} {stats['projected_s']:9.1f}s "
+              f"{stats['template_peak_mb']:8.1f}MB {stats['batch_peak_mb']:9.1f}MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=SIZES, help="roster rows (default: 10 1000 100000)")
+    parser.add_argument("--course", action="append", help="course(s) to run (default: every profile)")
+    parser.add_argument("--batches", type=int, default=MAX_BATCHES,
+                        help=f"batches timed per course (default: {MAX_BATCHES})")
+    parser.add_argument("--json", help="also save the results to this file")
+    args = parser.parse_args()
+
+    courses = args.course or available_courses()
+    results = [bench_size(rows, courses, args.batches) for rows in args.sizes]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"\nSaved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cold start of each course script: csv-module roster path vs. pandas.
+
+Run from the repository root:  python benchmarks/bench_startup.py [roster.csv]
+
+Each course is run the way its script ('Bronze Cross.py', 'SFA.py', ...)
+runs it, in a fresh interpreter, once with the default roster path
+(rosters under roster.LIGHT_ROSTER_BYTES never import pandas) and once
+forced through pandas. Times are the best of RUNS whole-process wall
+times, plus the import + roster-load part of it measured in-process.
+Roster snapshots are off, so every run parses the CSV as the first would.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROSTER = sys.argv[1] if len(sys.argv) > 1 else "roster.csv"
+RUNS = 3
+SCRIPTS = {
+    "bronze_cross": "Bronze Cross.py",
+    "bronze_medallion": "Bronze Med.py",
+    "bronze_star": "Bronze Star.py",
+    "sfa": "SFA.py",
+    "efa": "Emergency First Aid.py",
+}
+
+# What every course script does, with the roster load timed separately.
+RUN_COURSE = """
+import sys, time
+start = time.perf_counter()
+from lss_forms import engine, roster
+roster.ROSTER_SNAPSHOTS = False
+if {force_pandas}:
+    roster.LIGHT_ROSTER_BYTES = -1
+roster.load_records({roster!r})
+loaded = time.perf_counter() - start
+engine.run_courses([{course!r}], {roster!r}, {out!r})
+print(loaded, "pandas" in sys.modules, file=sys.stderr)
+"""
+
+
+def cold_run(course, out, force_pandas):
+    code = RUN_COURSE.format(course=course, roster=ROSTER, out=out, force_pandas=force_pandas)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True)
+    wall = time.perf_counter() - start
+    loaded, pandas_imported = result.stderr.split()[-2:]
+    return wall, float(loaded), pandas_imported == "True"
+
+
+def best(course, out, force_pandas):
+    runs = [cold_run(course, out, force_pandas) for _ in range(RUNS)]
+    return min(runs)
+
+
+print(f"Roster: {ROSTER} ({os.path.getsize(ROSTER)} bytes), best of {RUNS} cold runs")
+print(f"{'script':24} {'csv path':>19} {'pandas path':>19} {'saved':>7}")
+with tempfile.TemporaryDirectory() as out:
+    for course, script in SCRIPTS.items():
+        light_wall, light_load, light_pandas = best(course, out, False)
+        heavy_wall, heavy_load, _ = best(course, out, True)
+        note = "  (pandas imported)" if light_pandas else ""
+        print(f"{script:24} {light_wall:6.2f}s (load {light_load * 1000:4.0f}ms) "
+              f"{heavy_wall:6.2f}s (load {heavy_load * 1000:4.0f}ms) "
+              f"{(heavy_wall - light_wall) * 1000:5.0f}ms{note}")
@@ -0,0 +1,62 @@
+"""Per-batch template cost: fresh PdfReader + append vs. the template cache.
+
+Run from the repository root:  python benchmarks/bench_template_cache.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader, PdfWriter
+
+from lss_forms.templates import clone_template, load_template
+
+TEMPLATES = [
+    "95tsbronzecross2020_fillable.pdf",
+    "95tsbronzemedallion2020_fillable.pdf",
+    "95tsbronzestar2020_fillable.pdf",
+    "95on_sfa_test_sheet-20231121-fillable.pdf",
+    "95efa_on2014.pdf",
+]
+BATCHES = 5
+
+
+def open_uncached(path):
+    # What every script did before: parse the whole template per batch.
+    reader = PdfReader(path)
+    writer = PdfWriter()
+    writer.append(reader)
+    return writer
+
+
+def time_batches(open_template, path):
+    """Returns (ms to get a fillable writer, ms for that plus writing it out)."""
+    open_total = 0.0
+    batch_total = 0.0
+    for _ in range(BATCHES):
+        start = time.perf_counter()
+        writer = open_template(path)
+        opened = time.perf_counter()
+        writer.write(io.BytesIO())
+        done = time.perf_counter()
+        open_total += opened - start
+        batch_total += done - start
+    return open_total / BATCHES * 1000, batch_total / BATCHES * 1000
+
+
+print(f"{'template':45} {'open before':>12} {'open after':>11} {'batch before':>13} {'batch after':>12}")
+for path in TEMPLATES:
+    if not os.path.exists(path):
+        print(f"SKIP: {path} not found")
+        continue
+    before_open, before_batch = time_batches(open_uncached, path)
+
+    start = time.perf_counter()
+    load_template(path)
+    first_parse = (time.perf_counter() - start) * 1000
+    after_open, after_batch = time_batches(clone_template, path)
+
+    print(f"{path:45} {before_open:10.1f}ms {after_open:9.1f}ms {before_batch:11.1f}ms {after_batch:10.1f}ms"
+          f"   (one-time parse {first_parse:.0f}ms)")
@@ -0,0 +1,60 @@
+"""Per-batch field writes with and without a pre-filled host variant.
+
+Run from the repository root:  python benchmarks/bench_variants.py
+
+For one full batch of each course, times the fields stage as it was
+(template copy, host block + candidates written every batch) against the
+engine's path (host variant copy, candidates only), and reports what
+building the variant costs once per template and host block.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_roster
+from lss_forms.appearance import appearance_plans
+from lss_forms.engine import available_courses, build_data_map, host_data_map, load_profile
+from lss_forms.fields import field_index, write_fields
+from lss_forms.roster import load_records
+from lss_forms.templates import clone_template, copy_writer
+from lss_forms.variants import clear_variants, host_variant
+
+RUNS = 20
+
+
+def time_writes(writers, template, data_map):
+    index, plans = field_index(template), appearance_plans(template)
+    start = time.perf_counter()
+    for writer in writers:
+        write_fields(writer, index, data_map, plans)
+    return (time.perf_counter() - start) / len(writers) * 1000
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "roster.csv")
+    write_roster(path, 13)
+    records = load_records(path)
+
+print(f"{'course':18} {'host fields':>11} {'full map':>9} {'candidates':>11} {'saved':>7} {'variant build':>14}")
+for course in available_courses():
+    profile = load_profile(course)
+    template = profile["template"]
+    if not os.path.exists(template):
+        print(f"SKIP: {template} not found")
+        continue
+    batch = records[: profile["batch_size"]]
+    host_map = host_data_map(profile)
+
+    full_ms = time_writes([clone_template(template) for _ in range(RUNS)], template,
+                          build_data_map(profile, batch))
+    clear_variants()
+    start = time.perf_counter()
+    variant = host_variant(template, host_map)
+    build_ms = (time.perf_counter() - start) * 1000
+    candidates_ms = time_writes([copy_writer(variant) for _ in range(RUNS)], template,
+                                build_data_map(profile, batch, host=False))
+    print(f"{course:18} {len(host_map):11} {full_ms:7.2f}ms {candidates_ms:9.2f}ms "
+          f"{1 - candidates_ms / full_ms:6.0%} {build_ms:12.1f}ms")
@@ -0,0 +1,72 @@
+"""Time to updated sheets after a one-row roster edit: --watch vs. a fresh run.
+
+Run from the repository root:  python benchmarks/bench_watch.py [rows]
+
+Fills every course from a synthetic roster (default 100 rows), then edits
+one row and measures how long the sheets take to catch up:
+
+    watch, warm        run_courses(incremental=True) in this process, as
+                       watch.py does (debounce and polling not included)
+    fresh, incremental python -m lss_forms --incremental in a new process
+    fresh, full        python -m lss_forms in a new process (the old way)
+"""
+import contextlib
+import csv
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import COLUMNS, synthetic_rows
+from lss_forms.engine import available_courses, load_profile, run_courses
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+courses = [course for course in available_courses() if os.path.exists(load_profile(course)["template"])]
+roster_rows = list(synthetic_rows(rows))
+
+
+def write(path, edited):
+    # edited: how many rows so far got a new street, so each edit is new.
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        for i, row in enumerate(roster_rows):
+            writer.writerow({**row, "Street": f"{i} Edited Lane"} if i < edited else row)
+
+
+def in_process(roster, out):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = run_courses(courses, roster, out, incremental=True)
+    return time.perf_counter() - start, len(written)
+
+
+def fresh(roster, out, *flags):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "lss_forms", *courses, "--roster", roster, "--out", out, *flags],
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    roster, out = os.path.join(tmp, "roster.csv"), os.path.join(tmp, "out")
+    write(roster, 0)
+    first, sheets = in_process(roster, out)
+    print(f"{rows} rows, {len(courses)} course(s): first fill {sheets} sheets in {first:.2f}s")
+
+    write(roster, 1)
+    warm, changed = in_process(roster, out)
+    write(roster, 2)
+    incremental = fresh(roster, out, "--incremental")
+    write(roster, 3)
+    full = fresh(roster, out)
+
+print(f"  one row edited -> {changed} sheet(s) to refill")
+print(f"  {'watch, warm':20} {warm:7.2f}s")
+print(f"  {'fresh, incremental':20} {incremental:7.2f}s")
+print(f"  {'fresh, full':20} {full:7.2f}s  ({full / warm:.0f}x the watch update)")
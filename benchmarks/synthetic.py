@@ -0,0 +1,49 @@
+"""Synthetic rosters in the roster.csv schema, for benchmarks."""
+import csv
+import random
+
+COLUMNS = [
+    "CalendarName", "Supervisor", "EventStatus", "textBox4", "textBox12", "Alert",
+    "ServiceRowNumber", "AttendeeName", "AttendeePhone", "DateOfBirth", "E-mail",
+    "Street", "City", "State/Provicne", "PostalCode",
+]
+COURSES = ["Bronze Cross", "Bronze Medallion", "Bronze Star", "Standard First Aid", "Emergency First Aid"]
+FACILITIES = ["Thornlea Pool & Gymnasium", "Centennial C.C.", "Angus Glen C.C."]
+FIRST = ["Lautaro", "Maya", "Noah", "Priya", "Chen", "Olivia", "Amir", "Sofia", "Liam", "Zara"]
+LAST = ["Ausar", "Singh", "Wong", "Martin", "Haddad", "Rossi", "Nguyen", "Brown", "Patel", "Kim"]
+STREETS = ["McCowan Road", "Main Street", "Kennedy Road", "Warden Avenue", "Bur Oak Avenue"]
+
+
+def synthetic_rows(n, seed=0):
+    """Yields n roster rows as dicts; same seed, same rows."""
+    rng = random.Random(seed)
+    for i in range(n):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2005, 2012)
+        # Mix zero-padded and bare day/month, as in the real exports.
+        dob = f"{day:02d}/{month:02d}/{year}" if i % 2 else f"{day}/{month}/{year}"
+        yield {
+            "CalendarName": rng.choice(COURSES),
+            "Supervisor": "Recreation: Coordinator, West Area",
+            "EventStatus": "Confirmed",
+            "textBox4": str(rng.randint(1, 8)),
+            "textBox12": rng.choice(FACILITIES),
+            "Alert": "",
+            "ServiceRowNumber": str(i + 1),
+            "AttendeeName": f"{last} , {first}",
+            "AttendeePhone": f"905-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+            "DateOfBirth": dob,
+            "E-mail": f"{first.lower()}.{last.lower()}{i}@example.com",
+            "Street": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+            "City": "Markham",
+            "State/Provicne": "ON",
+            "PostalCode": f"L3P {rng.randint(1, 9)}M{rng.randint(1, 9)}",
+        }
+
+
+def write_roster(path, n, seed=0):
+    """Writes an n-row synthetic roster CSV to path."""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(synthetic_rows(n, seed))
@@ -0,0 +1 @@
+"""Shared helpers for the LSS test sheet scripts."""
@@ -0,0 +1,102 @@
+"""Fill several course forms in one run.
+
+    python -m lss_forms                       # every course in profiles/
+    python -m lss_forms bronze_cross sfa      # just these
+    python -m lss_forms --roster export.csv --out sheets/
+    python -m lss_forms --parallel            # one worker per CPU
+    python -m lss_forms --parallel 4          # four workers
+    python -m lss_forms --stream              # read huge exports in chunks
+    python -m lss_forms --pipeline            # fill the next batch while the last is saved
+    python -m lss_forms --route               # split one export by CalendarName,
+                                              # facility and session
+    python -m lss_forms --incremental         # only refill sheets whose inputs changed
+    python -m lss_forms --merge               # one PDF per course with every batch
+    python -m lss_forms --flatten             # bake values into the page, no form fields
+    python -m lss_forms --append              # template bytes as-is + an update with the values
+    python -m lss_forms --zip sheets.zip      # one zip archive instead of filled_forms/
+    python -m lss_forms --zip - > sheets.zip  # ... or on stdout
+    python -m lss_forms --report run.json     # time per stage per batch, as JSON
+    python -m lss_forms --profile run.prof    # cProfile dump (python -m pstats run.prof)
+    python -m lss_forms --check               # validate the roster against the forms, no PDFs
+    python -m lss_forms --watch               # refill changed sheets whenever the roster changes
+"""
+import argparse
+import sys
+
+from lss_forms import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m lss_forms", description=__doc__.splitlines()[0])
+    parser.add_argument("courses", nargs="*", help="profile names (default: all)")
+    parser.add_argument("--roster", default=engine.INPUT_CSV, help="roster CSV export")
+    parser.add_argument("--out", default=engine.OUTPUT_FOLDER, help="output folder")
+    parser.add_argument("--parallel", nargs="?", type=int, const=0, default=1, metavar="WORKERS",
+                        help="fill batches in a process pool (default size: CPU count)")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the roster in chunks instead of all at once")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading, filling, serializing and saving of batches "
+                             "(with --parallel, fill in a process pool)")
+    parser.add_argument("--route", action="store_true",
+                        help="send each row to the course in its CalendarName, "
+                             "one folder per facility/session")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip sheets whose template, host data and candidates are unchanged")
+    parser.add_argument("--merge", action="store_true",
+                        help="write one PDF per course holding every batch")
+    parser.add_argument("--flatten", action="store_true",
+                        help="paint the values into the page and drop the form fields")
+    parser.add_argument("--append", action="store_true",
+                        help="write each PDF as the unchanged template file followed by an "
+                             "incremental update holding only the filled values")
+    parser.add_argument("--zip", metavar="ARCHIVE",
+                        help="write every sheet into this zip ('-' for stdout) instead of --out")
+    parser.add_argument("--report", metavar="JSON",
+                        help="save the time spent in each stage of each batch to this file")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="add allocations per stage to --report (several times slower)")
+    parser.add_argument("--profile", metavar="PROF",
+                        help="save a cProfile dump of the run (this process only)")
+    parser.add_argument("--check", action="store_true",
+                        help="only report roster values the forms cannot hold (with --route, "
+                             "as routed); exits with status 1 on errors, writes nothing")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and refill the sheets a roster change affects "
+                             "(implies --incremental)")
+    args = parser.parse_args()
+    if args.trace_memory and not args.report:
+        parser.error("--trace-memory needs --report")
+    if args.zip == "-" and sys.stdout.isatty():
+        parser.error("refusing to write a zip archive to a terminal; redirect stdout")
+    if args.watch and (args.zip or args.merge or args.check):
+        parser.error("--watch keeps an output folder up to date; drop --zip, --merge and --check")
+
+    if args.check:
+        # Imported here: validation needs none of the filling machinery's setup.
+        from lss_forms.validate import run_check
+
+        sys.exit(1 if run_check(args.courses or engine.available_courses(), args.roster,
+                                args.route) else 0)
+
+    if args.watch:
+        from lss_forms.watch import watch
+
+        if args.parallel != 1 or args.stream or args.pipeline or args.report or args.profile:
+            print("WARNING: --watch fills in this process, where the templates stay warm; "
+                  "ignoring --parallel, --stream, --pipeline, --report and --profile.")
+        watch(args.courses or engine.available_courses(), args.roster, args.out,
+              route=args.route, flatten=args.flatten, append=args.append)
+        return
+
+    engine.run_courses(args.courses or engine.available_courses(), args.roster, args.out,
+                       workers=args.parallel or None, stream=args.stream, route=args.route,
+                       incremental=args.incremental, merge=args.merge,
+                       flatten=args.flatten, archive=args.zip, report=args.report,
+                       profile=args.profile, trace_memory=args.trace_memory,
+                       pipeline=args.pipeline, append=args.append)
+
+
+# The guard matters: pool workers re-import this module on spawn platforms.
+if __name__ == "__main__":
+    main()
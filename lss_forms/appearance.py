@@ -0,0 +1,269 @@
+"""Text-field appearance streams from metrics cached once per template.
+
+pypdf builds every appearance from scratch: for each widget of each batch
+it re-parses the /DA string, rebuilds the font (widths, encoding maps)
+from the /DR resource and measures the box again, which is ~95% of the
+time spent writing fields. Here all of that is worked out once per
+template, as a plan per widget (box size, font, size, colour, alignment,
+character widths). Filling a widget is then a width sum and a few lines of
+content stream, byte-for-byte what pypdf would have drawn.
+
+One thing differs on purpose: text that overflows a fixed-size field
+(a /DA of '/Helv 12 Tf') is shrunk to fit, as pypdf already does for
+auto-sized ('0 Tf') fields, down to MIN_FONT_SIZE.
+
+Widgets the fast path does not cover (multi-line, comb, rotated,
+bordered or coloured boxes, existing /AP, composite fonts) get no plan,
+and values a plan cannot draw (line breaks, characters outside the font's
+encoding, right-to-left text) are left to pypdf. See fields.write_fields.
+
+The plans lean on pypdf internals (its font model, /DA parser and RTL
+test), verified against the pypdf range in requirements.txt. Should a
+release move them, PLANS_AVAILABLE is False, templates get no plans and
+every widget is drawn by pypdf's own field writer.
+"""
+from pypdf.generic import (
+    ByteStringObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    RectangleObject,
+    TextStringObject,
+)
+
+from lss_forms.manifest import file_hash
+from lss_forms.templates import load_template
+
+try:
+    from pypdf._utils import is_char_rtl
+    from pypdf.generic._appearance_stream import TextStreamAppearance
+    from pypdf.generic._font import Font
+
+    if not (hasattr(Font, "_get_typographic_maps")
+            and hasattr(TextStreamAppearance, "_parse_default_appearance")):
+        raise ImportError("pypdf's font and /DA helpers have moved")
+    PLANS_AVAILABLE = True
+except ImportError as e:
+    PLANS_AVAILABLE = False
+    _UNAVAILABLE = e
+
+# --- CONFIGURATION ---
+# Smallest size text is shrunk to (pypdf's own floor for auto-sized fields).
+MIN_FONT_SIZE = 4.0
+# Shrink overflowing text in fixed-size fields too.
+AUTO_SHRINK = True
+
+# Field flags (PDF 32000-1, 12.7.4.3) that need pypdf's layout.
+_MULTILINE = 1 << 12
+_COMB = 1 << 24
+_LINE_BREAKS = set("\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029")  # str.splitlines()
+
+# --- CACHE ---
+# Keyed by (template path, template sha256, incremental):
+# {(page index, annot index): plan} (plans name their font by object
+# number, which the load mode decides)
+_PLANS = {}
+# Keyed by (template path, template sha256, incremental, font object
+# number): font metrics
+_FONTS = {}
+
+
+def _font_metrics(template, font_name, font_ref, incremental=False):
+    # incremental=True for fonts numbered as in the file (see templates.py).
+    key = (template, file_hash(template), incremental, font_ref.idnum)
+    metrics = _FONTS.get(key)
+    if metrics is None:
+        font = Font.from_font_resource(font_ref.get_object())
+        reverse_cmap, encoding_cmap = font._get_typographic_maps()
+        if font.character_map:
+            encodable = set(font.character_map.values())
+        elif isinstance(font.encoding, dict):
+            encodable = set(font.encoding.values())
+        else:
+            encodable = set()
+        metrics = {
+            "type0": font.sub_type == "Type0",
+            "widths": dict(font.character_widths),
+            "default_width": font.character_widths["default"],
+            "ascent": font.font_descriptor.ascent,
+            "leading": (font.font_descriptor.bbox[3] - font.font_descriptor.bbox[1]) / 1000,
+            "reverse_cmap": reverse_cmap,
+            "encoding_cmap": encoding_cmap,
+            "safe": {c for c in encodable if c not in _LINE_BREAKS and not is_char_rtl(c)},
+        }
+        _FONTS[key] = metrics
+    return metrics
+
+
+def _plan(template, incremental, page, annotation, field, acro_form):
+    # Mirrors pypdf's TextStreamAppearance.from_text_annotation for the
+    # cases it lays out as one plain line; None for everything else.
+    if field.get("/FT") != "/Tx" or "/AP" in annotation:
+        return None
+    if int(field.get("/Ff", 0)) & (_MULTILINE | _COMB):
+        return None
+    if page.get_inherited("/Rotate") in {90, 270}:
+        return None
+    characteristics = field.get_inherited("/MK", None)
+    if isinstance(characteristics, DictionaryObject) and (
+        int(characteristics.get("/R", 0)) % 360 or characteristics.get("/BC") or characteristics.get("/BG")
+    ):
+        return None
+
+    default_appearance = annotation.get_inherited("/DA", acro_form.get("/DA", None))
+    if not default_appearance:
+        default_appearance = TextStringObject("/Helv 0 Tf 0 g")
+    font_name, font_size, color = TextStreamAppearance._parse_default_appearance(default_appearance.get_object())
+    if font_name is None:
+        return None
+    resources = annotation.get_inherited("/DR", acro_form.get("/DR", DictionaryObject()))
+    fonts = resources.get("/Font", DictionaryObject())
+    font_ref = fonts.raw_get(font_name) if font_name in fonts else None
+    if not isinstance(font_ref, IndirectObject):
+        return None
+    font = _font_metrics(template, font_name, font_ref, incremental)
+    if font["type0"]:
+        return None
+
+    x0, y0, x1, y1 = [float(v) for v in annotation["/Rect"]]
+    rectangle = RectangleObject((0, 0, abs(x1 - x0), abs(y1 - y0)))
+    width, height = rectangle.width, rectangle.height
+    # No border colour means no border and no margin (see BaseStreamAppearance).
+    margin = 0
+    field_width = width - 4 * max(margin, 1)
+    field_height = height - 2 * margin
+    return {
+        "font": font,
+        "font_name": font_name,
+        "font_id": font_ref.idnum,
+        "font_size": font_size,
+        "color": (color.as_operator() if color is not None else "0 g"),
+        "alignment": int(field.get("/Q", 0)),
+        "bbox": rectangle,
+        "width": width,
+        "margin": margin,
+        "field_width": field_width,
+        "field_height": field_height,
+        "clip": (f"q\n/Tx BMC \nq\n{2 * max(margin, 1)} {margin} "
+                 f"{round(field_width - 2 * max(margin, 1), 3)} {round(field_height - margin, 3)} re\n"
+                 f"W\nBT\n").encode(),
+    }
+
+
+def appearance_plans(template, incremental=False):
+    """{(page index, annot index): plan} for a template's plain text widgets,
+    as loaded with incremental (see templates.py)."""
+    key = (template, file_hash(template), incremental)
+    plans = _PLANS.get(key)
+    if plans is not None:
+        return plans
+    if not PLANS_AVAILABLE:
+        if not any(cached[0] == template for cached in _PLANS):
+            print(f"WARNING: drawing every field of {template} with pypdf ({_UNAVAILABLE}).")
+        _PLANS[key] = {}
+        return _PLANS[key]
+
+    from lss_forms.fields import _widget_field
+
+    writer = load_template(template, incremental)
+    acro_form = writer._root_object.get("/AcroForm", DictionaryObject())
+    plans = {}
+    for page_index, page in enumerate(writer.pages):
+        for annot_index, annot in enumerate(page.get("/Annots", ())):
+            annotation = annot.get_object()
+            if annotation.get("/Subtype") != "/Widget" or "/Rect" not in annotation:
+                continue
+            plan = _plan(template, incremental, page, annotation, _widget_field(annotation), acro_form)
+            if plan is not None:
+                plans[(page_index, annot_index)] = plan
+    _PLANS[key] = plans
+    return plans
+
+
+def can_draw(plan, text):
+    """Whether the plan draws text exactly as pypdf would (or shrinks it)."""
+    return isinstance(text, str) and plan["font"]["safe"].issuperset(text)
+
+
+def fitted_size(font_size, text_width, field_width, field_height, leading):
+    """Size a line is drawn at: font_size, or what fits (/DA size 0, AUTO_SHRINK).
+
+    text_width is the line's width at 1pt in thousandths (glyph widths
+    summed); leading is the font's bbox height per point.
+    """
+    if font_size == 0:
+        max_vertical = field_height / leading
+        return round(max(min(max_vertical, field_width / (text_width / 1000 or 1)), MIN_FONT_SIZE), 1)
+    if AUTO_SHRINK and text_width * font_size / 1000 > field_width and text_width:
+        font_size = round(max(field_width / (text_width / 1000), MIN_FONT_SIZE), 1)
+        # round() can land a hair above the exact fit.
+        if text_width * font_size / 1000 > field_width and font_size > MIN_FONT_SIZE:
+            font_size = round(font_size - 0.1, 1)
+    return font_size
+
+
+def stream_data(plan, text):
+    """The appearance content stream for one value (see can_draw)."""
+    font = plan["font"]
+    reverse_cmap = font["reverse_cmap"]
+    widths, default_width = font["widths"], font["default_width"]
+    glyphs = "".join(reverse_cmap.get(char, char) for char in text)
+    glyph_width = sum([widths.get(glyph, default_width) for glyph in glyphs], 0.0)
+    font_size = fitted_size(plan["font_size"], glyph_width, plan["field_width"],
+                            plan["field_height"], font["leading"])
+
+    # The two ways pypdf measures a line, kept apart so the rounding matches.
+    if plan["font_size"] == 0:
+        lines = [glyph_width / 1000 * font_size]
+    else:
+        lines = [glyph_width * font_size / 1000] if text else []
+
+    margin = plan["margin"]
+    y_offset = margin + (plan["field_height"] - font["ascent"] * font_size / 1000) / 2
+    data = bytearray(plan["clip"])
+    data += f"{plan['font_name']} {font_size} Tf {plan['color']}\n".encode()
+    for line_width in lines:
+        if plan["alignment"] == 2:
+            x = plan["width"] - max(margin, 1) * 2 - line_width
+        elif plan["alignment"] == 1:
+            x = (plan["width"] - line_width) / 2
+        else:
+            x = max(margin, 1) * 2
+        data += f"{round(x, 3)} {round(y_offset, 3)} Td\n".encode()
+        encoding_cmap = font["encoding_cmap"]
+        encoded = b"".join(
+            encoding_cmap.get(glyph, bytes((ord(glyph),)) if ord(glyph) < 256 else b"?")
+            for glyph in glyphs
+        )
+        data += b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", rb"\(").replace(b")", rb"\)") + b") Tj\n"
+    data += b"ET\nQ\nEMC\nQ\n"
+    return bytes(data)
+
+
+def draw(writer, annotation, field, plan, text):
+    """Sets a field's value and gives its widget a fresh /AP /N stream."""
+    field[NameObject("/V")] = TextStringObject(text)
+
+    data = stream_data(plan, text)
+    stream = DecodedStreamObject()
+    stream[NameObject("/Type")] = NameObject("/XObject")
+    stream[NameObject("/Subtype")] = NameObject("/Form")
+    stream[NameObject("/BBox")] = plan["bbox"]
+    stream.set_data(ByteStringObject(data))
+    stream[NameObject("/Length")] = NumberObject(len(data))
+    stream[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({
+            NameObject(plan["font_name"]): IndirectObject(plan["font_id"], 0, writer),
+        })
+    })
+
+    appearance = annotation.get("/AP")
+    if appearance is not None and isinstance(appearance.raw_get("/N"), IndirectObject):
+        # A second key for the same widget: reuse its stream's number, as pypdf does.
+        idnum = appearance.raw_get("/N").idnum
+        writer._objects[idnum - 1] = stream
+        stream.indirect_reference = IndirectObject(idnum, 0, writer)
+    else:
+        annotation[NameObject("/AP")] = DictionaryObject({NameObject("/N"): writer._add_object(stream)})
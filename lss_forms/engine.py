@@ -0,0 +1,509 @@
+"""Course-agnostic filling engine driven by the JSON profiles in profiles/.
+
+A profile describes one course form: the template PDF, the output file
+name, how many candidates fit on a sheet, the host/facility block and the
+PDF field names for every candidate slot. See profiles/bronze_cross.json.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from lss_forms import instrument
+from lss_forms.appearance import appearance_plans
+from lss_forms.fields import field_index, missing_fields, write_fields
+from lss_forms.flatten import flatten_writer
+from lss_forms.increment import appended_pdf
+from lss_forms.manifest import Manifest, file_hash
+from lss_forms.merge import merge_batch, start_merged
+from lss_forms.roster import INPUT_CSV, load_records, parse_cache_stats, stream_records
+from lss_forms.routing import load_facilities, route_jobs, unmatched_facilities
+from lss_forms.sinks import FolderSink, ZipSink
+from lss_forms.slotmap import slot_map
+from lss_forms.templates import copy_writer
+from lss_forms.variants import host_variant
+
+# --- CONFIGURATION ---
+PROFILE_FOLDER = "profiles/"
+OUTPUT_FOLDER = "filled_forms/"
+# Roughly how many roster rows to hold in memory at once when streaming.
+STREAM_CHUNK_ROWS = 1300
+
+# --- CACHE ---
+# (template sha256, warning) pairs already printed, so a long-running
+# process (--watch, the web service) warns about a form once, not per run.
+_WARNED = set()
+
+
+def available_courses():
+    """Lists the course names that have a profile, e.g. 'bronze_cross'."""
+    return sorted(
+        os.path.splitext(f)[0]
+        for f in os.listdir(PROFILE_FOLDER)
+        if f.endswith(".json")
+    )
+
+
+def load_profile(course):
+    """Reads profiles/<course>.json.
+
+    A profile without "slots" uses the map discovered from its template
+    (see slotmap.py), and one without "batch_size" fills every slot.
+    """
+    with open(os.path.join(PROFILE_FOLDER, f"{course}.json")) as f:
+        profile = json.load(f)
+    profile["course"] = course
+    if "slots" not in profile and os.path.exists(profile["template"]):
+        profile["slots"] = slot_map(profile["template"])["slots"]
+    profile.setdefault("batch_size", len(profile.get("slots", ())))
+    return profile
+
+
+def _set_field(data_map, pdf_fields, value):
+    # A profile entry is either one field name or a list of them
+    # (e.g. the Bronze Cross ghost address field for candidate 9).
+    if isinstance(pdf_fields, list):
+        for field in pdf_fields:
+            data_map[field] = value
+    else:
+        data_map[pdf_fields] = value
+
+
+def host_data_map(profile):
+    """Maps PDF field names to the host & facility values of a profile."""
+    data_map = {}
+    for key, pdf_fields in profile["host_field_map"].items():
+        _set_field(data_map, pdf_fields, profile["host_data"][key])
+    return data_map
+
+
+def build_data_map(profile, records, host=True):
+    """Maps PDF field names to values for one batch of normalized records.
+
+    host=False leaves out the host block, for batches filled into a host
+    variant that already has it (see variants.py).
+    """
+    data_map = {}
+    slots = profile["slots"]
+
+    # --- 1. APPLY HOST & FACILITY DATA ---
+    if host:
+        data_map.update(host_data_map(profile))
+
+    # --- 2. APPLY CANDIDATE DATA ---
+    for slot, record in zip(slots, records):
+        for key, pdf_fields in slot.items():
+            if key in record:
+                _set_field(data_map, pdf_fields, record[key])
+
+    return data_map
+
+
+def batch_name(profile, batch_num):
+    """Relative path of a sheet, e.g. 'Bronze_Cross_Test_Sheet_2.pdf'."""
+    return profile["output_name"].format(batch_num=batch_num)
+
+
+def output_path(profile, batch_num, output_folder=OUTPUT_FOLDER):
+    """Where batch batch_num of a profile is written."""
+    return os.path.join(output_folder, batch_name(profile, batch_num))
+
+
+def fill_writer(profile, records, append=False):
+    """Fills a copy of the template in memory; None if it is missing.
+
+    The copy comes from the template's variant for this profile's host
+    block, so only the candidate fields are written per batch. append=True
+    copies the template as loaded for an incremental update (templates.py).
+    """
+    template = profile["template"]
+    if not os.path.exists(template):
+        print(f"ERROR: Could not find {template}")
+        return None
+
+    with instrument.stage("clone"):
+        writer = copy_writer(host_variant(template, host_data_map(profile), append))
+    with instrument.stage("fields"):
+        data_map = build_data_map(profile, records, host=False)
+        write_fields(writer, field_index(template, append), data_map, appearance_plans(template, append))
+    return writer
+
+
+def _pdf_bytes(writer, template=None):
+    # With a template path, the template file plus an update (increment.py).
+    if template is not None:
+        return appended_pdf(writer, template)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def batch_pdf(profile, records, flatten=False, append=False):
+    """Fills one sheet and returns the PDF as bytes (None if no template).
+
+    flatten=True paints the values into the page and drops the form fields
+    (see flatten.py). append=True writes the template file unchanged plus
+    an incremental update with what the batch changed (see increment.py).
+    """
+    writer = fill_writer(profile, records, append)
+    if writer is None:
+        return None
+    if flatten:
+        with instrument.stage("flatten"):
+            flatten_writer(writer)
+    with instrument.stage("write"):
+        return _pdf_bytes(writer, profile["template"] if append else None)
+
+
+def fill_batch(profile, records, batch_num, output_folder=OUTPUT_FOLDER, flatten=False, append=False):
+    """Fills one sheet for up to batch_size candidates and writes it out.
+
+    Returns the output path, or None if the template is missing.
+    """
+    data = batch_pdf(profile, records, flatten, append)
+    if data is None:
+        return None
+    return FolderSink(output_folder).write(batch_name(profile, batch_num), data)
+
+
+def report_missing_fields(profile, append=False):
+    """Warns once about profile fields the template does not have.
+
+    A replaced template (new sha256) is warned about again. append=True
+    looks in the template as --append loads it (see fill_writer).
+    """
+    if not os.path.exists(profile["template"]):
+        return
+    missing = missing_fields(profile, append)
+    if missing:
+        warning = (f"WARNING: {profile['template']} has no field(s) {', '.join(missing)}; "
+                   f"{profile['name']} will skip them.")
+        key = (file_hash(profile["template"]), warning)
+        if key not in _WARNED:
+            _WARNED.add(key)
+            print(warning)
+
+
+def iter_jobs(profiles, chunks, stats=None):
+    """Yields (profile, records, batch_num) for every batch of every course.
+
+    chunks is an iterable of record lists. Each chunk except the last must
+    hold a whole number of batches for every profile (see stream_chunk_rows),
+    so batch numbering simply continues from one chunk to the next. If a
+    stats dict is given it is filled with per-course [candidates, batches].
+    """
+    batch_nums = {profile["course"]: 0 for profile in profiles}
+    if stats is not None:
+        for profile in profiles:
+            stats[profile["course"]] = [0, 0]
+
+    for records in chunks:
+        for profile in profiles:
+            course = profile["course"]
+            batch_size = profile["batch_size"]
+            for i in range(math.ceil(len(records) / batch_size)):
+                batch_nums[course] += 1
+                batch = records[i * batch_size : (i + 1) * batch_size]
+                if stats is not None:
+                    stats[course][0] += len(batch)
+                    stats[course][1] += 1
+                yield profile, batch, batch_nums[course]
+
+
+def stream_chunk_rows(profiles, target_rows=None):
+    """Rows per streamed chunk: a multiple of every profile's batch size."""
+    step = math.lcm(*(profile["batch_size"] for profile in profiles))
+    return step * max(1, (target_rows or STREAM_CHUNK_ROWS) // step)
+
+
+def fill_jobs(jobs, sink, flatten=False, append=False):
+    """Fills batches one after another into a sink; returns what was written."""
+    written = []
+    for profile, batch, batch_num in jobs:
+        with instrument.batch(profile["course"], batch_num):
+            data = batch_pdf(profile, batch, flatten, append)
+            if data is not None:
+                with instrument.stage("save"):
+                    output_filename = sink.write(batch_name(profile, batch_num), data)
+                print(f"Generated: {output_filename}")
+                written.append(output_filename)
+    return written
+
+
+def merged_name(profile):
+    """Relative path of the merged PDF of a course (or routed group)."""
+    return batch_name(profile, "all")
+
+
+def fill_jobs_merged(jobs, sink, flatten=False, append=False):
+    """Fills every batch into one PDF per course; returns what was written.
+
+    The batches share the template's fonts, images and page content (see
+    merge.py). Each merged writer is held until the end of the run, so
+    very large streamed rosters cost memory in proportion to the batches.
+    """
+    merged = {}
+    profiles = {}
+    for profile, batch, batch_num in jobs:
+        with instrument.batch(profile["course"], batch_num):
+            writer = fill_writer(profile, batch, append)
+            if writer is None:
+                continue
+            name = merged_name(profile)
+            with instrument.stage("merge"):
+                if name in merged:
+                    merge_batch(merged[name], writer, batch_num, profile["template"], append)
+                else:
+                    merged[name] = start_merged(writer, batch_num)
+                    profiles[name] = profile
+
+    written = []
+    for name, writer in merged.items():
+        profile = profiles[name]
+        with instrument.batch(profile["course"], "all"):
+            if flatten:
+                with instrument.stage("flatten"):
+                    flatten_writer(writer)
+            with instrument.stage("write"):
+                data = _pdf_bytes(writer, profile["template"] if append else None)
+            with instrument.stage("save"):
+                output_filename = sink.write(name, data)
+        print(f"Generated: {output_filename}")
+        written.append(output_filename)
+    return written
+
+
+# --- PARALLEL MODE ---
+# Every worker process parses its own copy of each template once (in the
+# pool initializer) and then fills whole batches. Output names are derived
+# from batch_num, so they are identical to a sequential run.
+
+def _init_worker(templates, quiet=False, report=None, append=False):
+    if quiet:
+        # stdout is carrying a zip archive; keep worker messages off it.
+        sys.stdout = sys.stderr
+    if report is not None:
+        # Same options as the parent's recorder; records go back per batch.
+        instrument.start(**report)
+    for template in templates:
+        if os.path.exists(template):
+            field_index(template, append)
+            appearance_plans(template, append)
+
+
+def _batch_pdf_timed(profile, records, batch_num, flatten, append=False):
+    # CPU time, not wall time: workers sharing a core would otherwise each
+    # report the time they spent waiting for the others.
+    start = time.process_time()
+    with instrument.batch(profile["course"], batch_num):
+        data = batch_pdf(profile, records, flatten, append)
+    return batch_name(profile, batch_num), data, time.process_time() - start, instrument.take()
+
+
+def fill_jobs_parallel(jobs, templates, sink, workers=None, flatten=False, append=False):
+    """Fills batches across a process pool; the sink is written from here.
+
+    workers defaults to the CPU count. At most two batches per worker are
+    in flight, so a streamed roster is never pulled into memory ahead of
+    the pool. Prints wall time next to the summed per-batch CPU time, i.e.
+    what the same batches cost on a single core. Returns what was written.
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Filling batches on {workers} worker(s)...")
+    start = time.perf_counter()
+    single_core = 0.0
+    written = []
+
+    def collect(future):
+        nonlocal single_core
+        name, data, elapsed, records = future.result()
+        single_core += elapsed
+        instrument.add(records)
+        if data is not None:
+            with instrument.stage("save"):
+                output_filename = sink.write(name, data)
+            print(f"Generated: {output_filename}")
+            written.append(output_filename)
+
+    quiet = sys.stdout is not sys.__stdout__
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(templates, quiet, instrument.active(), append)) as pool:
+        pending = deque()
+        for profile, batch, batch_num in jobs:
+            pending.append(pool.submit(_batch_pdf_timed, profile, batch, batch_num, flatten, append))
+            if len(pending) >= workers * 2:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    wall = time.perf_counter() - start
+
+    speedup = single_core / wall if wall else 0.0
+    print(f"Wall time {wall:.2f}s vs. {single_core:.2f}s single-core ({speedup:.1f}x)")
+    return written
+
+
+def run_courses(courses, input_csv=INPUT_CSV, output_folder=OUTPUT_FOLDER, workers=1,
+                stream=False, route=False, incremental=False, merge=False, flatten=False,
+                archive=None, report=None, profile=None, trace_memory=False, pipeline=False,
+                append=False):
+    """Fills every listed course from a single read of the roster.
+
+    workers=1 fills batches one after another; anything else (None meaning
+    the CPU count) fans them out to a process pool. stream=True reads the
+    roster in chunks instead of all at once, keeping memory flat.
+    route=True sends each row only to the course named in its CalendarName,
+    grouped by facility and session (see routing.py); otherwise every
+    listed course gets the whole roster. incremental=True only refills
+    sheets whose inputs changed since the last run into output_folder and
+    removes the ones no batch produces any more (see manifest.py).
+    merge=True writes one PDF per course (per group when routing) holding
+    every batch instead of one file per batch. flatten=True bakes the
+    values into the page content and drops the form fields. archive (a
+    .zip path, or "-" for stdout) streams every sheet into one zip instead
+    of writing files to output_folder. pipeline=True overlaps reading,
+    filling, serializing and saving of consecutive batches (see
+    pipeline.py); with workers other than 1 the filling and serializing
+    run in a process pool. append=True writes every PDF as its template
+    file, byte for byte, plus an incremental update holding only what was
+    filled in (see increment.py).
+
+    report (a path) saves a JSON run report with the time spent in every
+    stage of every batch (see instrument.py); trace_memory=True adds
+    allocations to it at a large speed cost. profile (a path) saves a
+    cProfile dump of this process for pstats or snakeviz.
+
+    Returns the sheets written (paths, or archive:name entries).
+    """
+    with contextlib.ExitStack() as stack:
+        if archive == "-":
+            # The archive owns stdout, so progress messages go to stderr.
+            archive = sys.stdout.buffer
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        if report:
+            instrument.start(trace_memory)
+        profiler = cProfile.Profile() if profile else None
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            return _run_courses(courses, input_csv, output_folder, workers, stream, route,
+                                incremental, merge, flatten, archive, pipeline, append)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile)
+                print(f"Profile: {profile}")
+            if report:
+                options = {
+                    "courses": list(courses), "roster": input_csv, "workers": workers,
+                    "stream": stream, "route": route, "incremental": incremental,
+                    "merge": merge, "flatten": flatten, "zip": archive is not None,
+                    "pipeline": pipeline, "append": append,
+                }
+                wall = time.perf_counter() - start
+                run_report = instrument.build_report(instrument.stop(), wall, options)
+                run_report["parse_cache"] = parse_cache_stats()
+                instrument.write_report(report, run_report)
+                report_parse_cache(run_report["parse_cache"])
+
+
+def _run_courses(courses, input_csv, output_folder, workers, stream, route,
+                 incremental, merge, flatten, archive, pipeline, append):
+    print(f"Reading {input_csv}...")
+    if not os.path.exists(input_csv):
+        print(f"ERROR: {input_csv} not found.")
+        return []
+
+    profiles = [load_profile(course) for course in courses]
+    for profile in profiles:
+        report_missing_fields(profile, append)
+
+    if stream:
+        chunks = stream_records(input_csv, stream_chunk_rows(profiles))
+    else:
+        chunks = [load_records(input_csv)]
+    stats = {}
+    skipped = {}
+    if route:
+        facilities = load_facilities()
+        jobs = route_jobs(profiles, chunks, facilities, stats, skipped)
+    else:
+        jobs = iter_jobs(profiles, chunks, stats)
+
+    if archive is None:
+        sink = FolderSink(output_folder)
+    else:
+        sink = ZipSink(archive)
+        if incremental:
+            print("WARNING: --incremental only applies to an output folder; refilling everything.")
+            incremental = False
+    with sink:
+        if merge:
+            if incremental:
+                print("WARNING: --incremental does not apply to merged output; refilling everything.")
+                incremental = False
+            if workers != 1:
+                print("WARNING: merged output is filled in a single process.")
+            if pipeline:
+                print("WARNING: merged output is not pipelined; filling batches in turn.")
+            written = fill_jobs_merged(jobs, sink, flatten, append)
+        else:
+            if incremental:
+                manifest = Manifest(output_folder, {"flatten": flatten, "append": append})
+                jobs = manifest.changed_jobs(jobs, output_path)
+            templates = sorted({profile["template"] for profile in profiles})
+            if pipeline:
+                # Imported here: pipeline.py builds on this module.
+                from lss_forms.pipeline import fill_jobs_async
+
+                processes = 0 if workers == 1 else workers or os.cpu_count() or 1
+                written = fill_jobs_async(jobs, sink, flatten, processes, templates, append)
+            elif workers == 1:
+                written = fill_jobs(jobs, sink, flatten, append)
+            else:
+                written = fill_jobs_parallel(jobs, templates, sink, workers, flatten, append)
+    if incremental:
+        for stale in manifest.finish(written, courses):
+            print(f"Removed stale: {stale}")
+        print(f"Up to date: {manifest.unchanged} sheet(s), regenerated: {len(written)}")
+
+    if route:
+        report_routes(profiles, stats, skipped, facilities)
+    else:
+        for profile in profiles:
+            candidates, batches = stats[profile["course"]]
+            print(f"{profile['name']}: {candidates} candidates in {batches} batch(es)")
+    print("Done.")
+    return written
+
+
+def report_parse_cache(stats):
+    """Prints the hit rate of each roster parsing cache that was used."""
+    for name, cache in stats.items():
+        if cache["hit_rate"] is not None:
+            print(f"  {name} cache: {cache['hit_rate']:.0%} of {cache['hits'] + cache['misses']} "
+                  f"lookup(s) hit, {cache['size']} entries")
+
+
+def report_routes(profiles, stats, skipped, facilities=()):
+    """Prints one line per routed group, then anything that was skipped and
+    every facility without a facilities/*.json."""
+    names = {profile["course"]: profile["name"] for profile in profiles}
+    unmatched = unmatched_facilities(stats, facilities)
+    for (course, facility, session), (candidates, batches) in sorted(stats.items()):
+        where = facility or "unknown facility"
+        if session:
+            where += f", session {session}"
+        note = " (no facility file)" if facility in unmatched else ""
+        print(f"{names[course]} @ {where}: {candidates} candidates in {batches} batch(es){note}")
+    for calendar_name, rows in sorted(skipped.items()):
+        print(f"SKIPPED: {rows} row(s) with CalendarName '{calendar_name}' (no profile lists it)")
+    for facility, groups in sorted(unmatched.items()):
+        print(f"WARNING: no facilities/*.json matches '{facility or 'unknown facility'}'; its "
+              f"{groups} group(s) got the course host block with the facility fields from the roster.")
@@ -0,0 +1,161 @@
+"""Field-write plans: find each field's widgets once per template.
+
+pypdf's update_page_form_field_values walks every annotation on a page and
+compares it against every key in data_map. The forms have ~300-800 widgets
+and each batch writes ~100 keys, so most of that work is repeated matching.
+Here the matching is done once per template: every field name maps to the
+pages and /Annots positions of its widgets. Filling a batch then hands pypdf
+only the widgets that belong to each field.
+"""
+from pypdf.generic import ArrayObject, BooleanObject, DictionaryObject, NameObject
+
+from lss_forms.appearance import can_draw, draw
+from lss_forms.manifest import file_hash
+from lss_forms.templates import load_template
+
+# --- CONFIGURATION ---
+# Every written widget gets a complete appearance stream (sized to fit, see
+# appearance.py), so viewers are not asked to rebuild them on open. True
+# hands the look of the fields back to each viewer. A document where any
+# text value was left to pypdf gets True regardless: pypdf draws glyphs
+# its font cannot encode as "?", which viewers would otherwise show as is.
+NEED_APPEARANCES = False
+
+# --- CACHE ---
+# Keyed by (template path, template sha256, incremental): {field name: [(page index, [annot index, ...])]}
+_FIELD_INDEXES = {}
+
+
+def _widget_field(annotation):
+    # Same rule pypdf uses: a widget is either merged with its field or
+    # hangs off a /Parent field dictionary.
+    if "/FT" in annotation and "/T" in annotation:
+        return annotation
+    return annotation.get("/Parent", DictionaryObject()).get_object()
+
+
+def qualified_name(field):
+    """Full dotted name of a field, e.g. 'Name1.1.0' (pypdf's rule)."""
+    parts = []
+    seen = set()
+    while id(field) not in seen:
+        seen.add(id(field))
+        if "/TM" in field:
+            parts.append(field["/TM"])
+            break
+        parts.append(field.get("/T", ""))
+        if "/Parent" not in field:
+            break
+        field = field["/Parent"].get_object()
+    return ".".join(reversed(parts))
+
+
+def field_index(path, incremental=False):
+    """Maps every field name in a template to the widgets that show it.
+
+    Both the fully-qualified name (e.g. 'Name1.1.0') and the widget's own
+    partial /T name are indexed, since pypdf matches data_map keys on both.
+    """
+    key = (path, file_hash(path), incremental)
+    index = _FIELD_INDEXES.get(key)
+    if index is not None:
+        return index
+
+    writer = load_template(path, incremental)
+    index = {}
+    for page_index, page in enumerate(writer.pages):
+        if "/Annots" not in page:
+            continue
+        positions = {}
+        for annot_index, annot in enumerate(page["/Annots"]):
+            annotation = annot.get_object()
+            if annotation.get("/Subtype", "") != "/Widget":
+                continue
+            field = _widget_field(annotation)
+            names = {qualified_name(field), field.get("/T", None)}
+            for name in names:
+                if name is not None:
+                    positions.setdefault(name, []).append(annot_index)
+        for name, annot_indexes in positions.items():
+            index.setdefault(name, []).append((page_index, annot_indexes))
+
+    _FIELD_INDEXES[key] = index
+    return index
+
+
+def profile_field_names(profile):
+    """Every PDF field name a profile can write to."""
+    names = []
+    for pdf_fields in list(profile["host_field_map"].values()) + [
+        value for slot in profile["slots"] for value in slot.values()
+    ]:
+        names.extend(pdf_fields if isinstance(pdf_fields, list) else [pdf_fields])
+    return names
+
+
+def missing_fields(profile, incremental=False):
+    """Profile field names the template does not have (in profile order).
+
+    incremental picks the template load the run fills from (templates.py),
+    so the check does not parse the template a second time.
+    """
+    index = field_index(profile["template"], incremental)
+    missing = []
+    for name in profile_field_names(profile):
+        if name not in index and name not in missing:
+            missing.append(name)
+    return missing
+
+
+def write_fields(writer, index, data_map, plans=None):
+    """Writes data_map into a template copy using a precomputed field index.
+
+    Keys the template does not have are skipped; report them up front with
+    missing_fields(). Later keys win when two keys share a widget, exactly
+    as with a full update_page_form_field_values pass. With the template's
+    appearance plans (appearance.appearance_plans), plain text widgets are
+    drawn from cached metrics and only the rest go through pypdf.
+
+    Returns whether any text value went through pypdf, in which case the
+    document asks viewers to redraw its fields (see NEED_APPEARANCES). A
+    copy of a writer that already asks (e.g. a host variant) keeps asking.
+    """
+    acro_form = writer._root_object.get("/AcroForm", DictionaryObject())
+    already = acro_form.get("/NeedAppearances") == BooleanObject(True)
+    writer.set_need_appearances_writer(NEED_APPEARANCES or already)
+    fell_back = False
+    pages = writer.pages
+    for field, value in data_map.items():
+        for page_index, annot_indexes in index.get(field, ()):
+            page = pages[page_index]
+            if plans is not None:
+                annots = page["/Annots"]
+                rest = []
+                for annot_index in annot_indexes:
+                    plan = plans.get((page_index, annot_index))
+                    if plan is not None and can_draw(plan, value):
+                        annotation = annots[annot_index].get_object()
+                        draw(writer, annotation, _widget_field(annotation), plan, value)
+                    else:
+                        rest.append(annot_index)
+                if not rest:
+                    continue
+                annot_indexes = rest
+            if value and isinstance(value, str) and not fell_back:
+                annots = page["/Annots"]
+                fell_back = any(
+                    _widget_field(annots[i].get_object()).get_inherited("/FT", None) == "/Tx"
+                    for i in annot_indexes
+                )
+            all_annots = page.raw_get("/Annots")
+            annots = page["/Annots"]
+            # Narrow the page to this field's widgets for the duration of
+            # the call, so pypdf only generates appearances for them.
+            page[NameObject("/Annots")] = ArrayObject(annots[i] for i in annot_indexes)
+            try:
+                writer.update_page_form_field_values(page, {field: value}, auto_regenerate=None)
+            finally:
+                page[NameObject("/Annots")] = all_annots
+    if fell_back:
+        writer.set_need_appearances_writer(True)
+    return fell_back
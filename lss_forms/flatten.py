@@ -0,0 +1,141 @@
+"""Flattening: paint filled fields into the page and drop the form.
+
+Every visible widget's normal appearance (/AP /N, or the /AS state of a
+check box) is drawn into its page as a form XObject placed over the
+widget's /Rect, exactly where a viewer would have shown it. The widgets
+are then removed from /Annots and the /AcroForm is dropped, so viewers
+have nothing left to regenerate on open and the values can't be edited.
+"""
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+)
+
+# Annotation flags (PDF 32000-1, 12.5.3) that keep a widget off the page.
+_HIDDEN = 1 << 1
+_NO_VIEW = 1 << 5
+
+
+def _normal_appearance(annotation):
+    appearance = annotation.get("/AP", {}).get("/N")
+    if appearance is None:
+        return None
+    appearance = appearance.get_object()
+    if "/BBox" in appearance:
+        return appearance
+    # Check boxes and radio buttons keep one stream per state.
+    state = annotation.get("/AS")
+    return appearance.get(state).get_object() if state in appearance else None
+
+
+def _placement(appearance, rect):
+    # The cm that maps the appearance's (transformed) /BBox onto /Rect
+    # (PDF 32000-1, 12.5.5); Do applies the form's own /Matrix itself.
+    a, b, c, d, e, f = [float(v) for v in appearance.get("/Matrix", (1, 0, 0, 1, 0, 0))]
+    x0, y0, x1, y1 = [float(v) for v in appearance["/BBox"]]
+    corners = [(a * x + c * y + e, b * x + d * y + f) for x in (x0, x1) for y in (y0, y1)]
+    bx0 = min(x for x, _ in corners)
+    by0 = min(y for _, y in corners)
+    bx1 = max(x for x, _ in corners)
+    by1 = max(y for _, y in corners)
+    rx0, ry0, rx1, ry1 = [float(v) for v in rect]
+    rx0, rx1 = min(rx0, rx1), max(rx0, rx1)
+    ry0, ry1 = min(ry0, ry1), max(ry0, ry1)
+    sx = (rx1 - rx0) / (bx1 - bx0) if bx1 != bx0 else 1
+    sy = (ry1 - ry0) / (by1 - by0) if by1 != by0 else 1
+    return f"{sx:.6g} 0 0 {sy:.6g} {rx0 - bx0 * sx:.6g} {ry0 - by0 * sy:.6g} cm"
+
+
+def _content_stream(writer, data):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return writer._add_object(stream)
+
+
+def flatten_page(writer, page):
+    """Paints a page's widgets into its content and removes them."""
+    if "/Annots" not in page:
+        return
+    xobjects = {}
+    commands = []
+    kept = ArrayObject()
+    for annot in page["/Annots"]:
+        annotation = annot.get_object()
+        if annotation.get("/Subtype") != "/Widget":
+            kept.append(annot)
+            continue
+        if int(annotation.get("/F", 0)) & (_HIDDEN | _NO_VIEW):
+            continue
+        appearance = _normal_appearance(annotation)
+        if appearance is None or "/Rect" not in annotation:
+            continue
+        ref = appearance.indirect_reference
+        if not isinstance(ref, IndirectObject) or ref.pdf is not writer:
+            ref = writer._add_object(appearance)
+        name = NameObject(f"/LssFlat{ref.idnum}")
+        xobjects[name] = ref
+        commands.append(f"q {_placement(appearance, annotation['/Rect'])} {name} Do Q")
+
+    if xobjects:
+        # Copy /Resources rather than edit it: it is often shared between
+        # pages (and between batches in a merged file).
+        resources = DictionaryObject(page.get("/Resources", DictionaryObject()))
+        page_xobjects = DictionaryObject(resources.get("/XObject", DictionaryObject()))
+        page_xobjects.update(xobjects)
+        resources[NameObject("/XObject")] = page_xobjects
+        page[NameObject("/Resources")] = resources
+
+        # Wrap the original content in q/Q so its graphics state can't
+        # leak into the painted fields.
+        contents = page.raw_get("/Contents") if "/Contents" in page else ArrayObject()
+        contents = contents.get_object() if isinstance(contents, IndirectObject) else contents
+        if not isinstance(contents, ArrayObject):
+            contents = ArrayObject([page.raw_get("/Contents")])
+        page[NameObject("/Contents")] = ArrayObject([
+            _content_stream(writer, b"q\n"),
+            *contents,
+            _content_stream(writer, ("Q\n" + "\n".join(commands) + "\n").encode()),
+        ])
+
+    if kept:
+        page[NameObject("/Annots")] = kept
+    else:
+        del page["/Annots"]
+
+
+def _drop_unreachable(writer):
+    # pypdf writes every object it holds; once the widgets and field tree
+    # are gone nothing refers to them, so free their slots.
+    reachable = set()
+    pending = [writer._root_object, writer._info_obj]
+    while pending:
+        obj = pending.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in reachable:
+                continue
+            reachable.add(obj.idnum)
+            obj = obj.get_object()
+        if isinstance(obj, DictionaryObject):
+            pending.extend(obj.values())
+        elif isinstance(obj, ArrayObject):
+            pending.extend(obj)
+    reachable.update(
+        obj.indirect_reference.idnum
+        for obj in (writer._root_object, writer._info_obj)
+        if obj is not None and obj.indirect_reference is not None
+    )
+    for idnum in range(1, len(writer._objects) + 1):
+        if idnum not in reachable:
+            writer._objects[idnum - 1] = None
+
+
+def flatten_writer(writer):
+    """Flattens every page of a filled writer and drops its /AcroForm."""
+    for page in writer.pages:
+        flatten_page(writer, page)
+    if "/AcroForm" in writer._root_object:
+        del writer._root_object["/AcroForm"]
+    _drop_unreachable(writer)
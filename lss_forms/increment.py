@@ -0,0 +1,171 @@
+"""Appended output: the template file as-is plus an update holding the values.
+
+A full write re-serializes every object of a 0.5-1.5 MB template (fonts,
+images, page content) to change ~100 text values. A PDF can instead be
+extended in place (PDF 32000-1, 7.5.6): the original bytes untouched,
+then the new and changed objects, a cross-reference section for just
+those and a trailer pointing back at the original one (/Prev). Viewers
+read from the end of the file, so they see the filled form.
+
+Templates loaded for it keep the file's object numbers (templates.py,
+incremental=True), so a changed object is written under its own number.
+Filling, flattening and merging only ever touch the catalog, the page
+tree, pages and their /Annots, the /AcroForm and its field tree (widgets
+included), appearance streams refilled in place and objects added past
+the template's last number. Those candidates are compared with the
+template and only the ones that differ are written, so a batch costs in
+proportion to its values, not to the size of the form.
+
+The template file is memory-mapped once per process and shared by every
+batch. With --flatten a full write is smaller: here the form objects the
+flattened pages no longer use stay in the file (blank, as in the template).
+"""
+import io
+import mmap
+import re
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+from lss_forms.merge import _batch_objects
+from lss_forms.templates import load_template
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+# --- CACHE ---
+# Keyed by template path: (the parsed template it belongs to, mmap of the
+# file, offset of its last xref section, whether that is an xref stream)
+_SOURCES = {}
+
+
+def _source(path, template):
+    source = _SOURCES.get(path)
+    # A template parsed again (replaced, or templates.clear_templates) is mapped again.
+    if source is None or source[0] is not template:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        prev = int(_STARTXREF.findall(data[-1024:])[-1])
+        source = (template, data, prev, data[prev:prev + 4] != b"xref")
+        _SOURCES[path] = source
+    return source[1:]
+
+
+def _same(obj, original):
+    # Copies share stream data with the template and only differ in which
+    # writer their references point at, so references compare by number
+    # and streams by data identity.
+    if isinstance(obj, IndirectObject):
+        return isinstance(original, IndirectObject) and obj.idnum == original.idnum
+    if type(obj) is not type(original):
+        return False
+    if isinstance(obj, DictionaryObject):
+        if isinstance(obj, StreamObject) and obj._data is not original._data:
+            return False
+        return obj.keys() == original.keys() and all(
+            _same(value, original.raw_get(key)) for key, value in obj.items()
+        )
+    if isinstance(obj, ArrayObject):
+        return len(obj) == len(original) and all(map(_same, obj, original))
+    return obj == original
+
+
+def changed_objects(writer, template):
+    """Numbers of the objects a filled copy of template adds or changes."""
+    root = template._root_object
+    candidates = _batch_objects(writer, template)
+    candidates.add(root.indirect_reference.idnum)
+    refs = [root.raw_get("/Pages"), root.raw_get("/AcroForm") if "/AcroForm" in root else None]
+    acro_form = root.get("/AcroForm", DictionaryObject())
+    resources = acro_form.get("/DR", DictionaryObject())
+    refs += [acro_form.raw_get(key) for key in ("/Fields", "/DR") if key in acro_form]
+    refs += [resources.raw_get("/Font") if "/Font" in resources else None]
+    candidates.update(ref.idnum for ref in refs if isinstance(ref, IndirectObject))
+
+    limit = len(template._objects)
+    changed = [
+        idnum for idnum in sorted(candidates)
+        if idnum <= limit and writer._objects[idnum - 1] is not None
+        and not _same(writer._objects[idnum - 1], template._objects[idnum - 1])
+    ]
+    changed += [
+        idnum for idnum in range(limit + 1, len(writer._objects) + 1)
+        if writer._objects[idnum - 1] is not None
+    ]
+    return changed
+
+
+def _subsections(idnums):
+    # [(first number, count)] runs of consecutive object numbers.
+    runs = []
+    for idnum in idnums:
+        if runs and runs[-1][0] + runs[-1][1] == idnum:
+            runs[-1][1] += 1
+        else:
+            runs.append([idnum, 1])
+    return runs
+
+
+def appended_pdf(writer, template_path):
+    """A filled copy of a template as the template file plus an update (bytes)."""
+    template = load_template(template_path, incremental=True)
+    source, prev, xref_stream = _source(template_path, template)
+    separator = b"" if source[-1:] in (b"\n", b"\r") else b"\n"
+    start = len(source) + len(separator)
+
+    update = io.BytesIO()
+    offsets = {}
+    for idnum in changed_objects(writer, template):
+        offsets[idnum] = start + update.tell()
+        update.write(b"%d 0 obj\n" % idnum)
+        writer._objects[idnum - 1].write_to_stream(update)
+        update.write(b"\nendobj\n")
+
+    size = max(len(writer._objects), len(template._objects)) + 1
+    trailer = DictionaryObject({
+        NameObject("/Size"): NumberObject(size),
+        NameObject("/Prev"): NumberObject(prev),
+        NameObject("/Root"): template._root_object.indirect_reference,
+    })
+    if isinstance(template._info_obj, IndirectObject):
+        trailer[NameObject("/Info")] = template._info_obj
+    if template._ID is not None:
+        trailer[NameObject("/ID")] = template._ID
+
+    xref_offset = start + update.tell()
+    if xref_stream:
+        # The update's own xref stream takes the next free number.
+        offsets[size] = xref_offset
+        trailer[NameObject("/Size")] = NumberObject(size + 1)
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        stream = DecodedStreamObject()
+        stream.update(trailer)
+        stream[NameObject("/Type")] = NameObject("/XRef")
+        stream[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(width), NumberObject(1)])
+        stream[NameObject("/Index")] = ArrayObject(
+            NumberObject(n) for run in _subsections(sorted(offsets)) for n in run
+        )
+        stream.set_data(b"".join(
+            b"\x01" + offsets[idnum].to_bytes(width, "big") + b"\x00" for idnum in sorted(offsets)
+        ))
+        update.write(b"%d 0 obj\n" % size)
+        stream.write_to_stream(update)
+        update.write(b"\nendobj\n")
+    else:
+        # Starts with the free-list head, as Acrobat's updates do.
+        update.write(b"xref\n0 1\n0000000000 65535 f\r\n")
+        for first, count in _subsections(sorted(offsets)):
+            update.write(b"%d %d\n" % (first, count))
+            for idnum in range(first, first + count):
+                update.write(b"%010d 00000 n\r\n" % offsets[idnum])
+        update.write(b"trailer\n")
+        trailer.write_to_stream(update)
+        update.write(b"\n")
+    update.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+    return b"".join((source, separator, update.getvalue()))
@@ -0,0 +1,180 @@
+"""Run instrumentation: time (and optionally memory) per stage per batch.
+
+The engine marks its stages with instrument.stage(name):
+
+    read       loading roster rows from the CSV (per chunk when streaming)
+    normalize  turning rows into records
+    snapshot   loading the records from a roster snapshot instead (snapshot.py)
+    template   parsing a template PDF (once per process)
+    variant    pre-filling a template with a host block (once per process)
+    clone      copying the cached template (or host variant)
+    fields     building the data map and writing the widgets
+    flatten    baking values into the page (--flatten only)
+    merge      grafting a batch into the course's merged PDF (--merge only)
+    write      serializing the PDF to bytes
+    save       handing the bytes to the output folder or zip
+
+and wraps each batch in instrument.batch(course, batch_num). Nothing is
+recorded unless a run starts a recorder, so the marks cost one function
+call each otherwise. Pool workers run their own recorder and send the
+records back with every batch (see engine.fill_jobs_parallel). The
+current batch is kept per thread, so the threads of a pipelined run
+(see pipeline.py) each credit their stages to the batch they work on.
+
+With trace_memory=True every stage also records the bytes it left
+allocated and its allocation peak, via tracemalloc. Tracing makes
+pypdf-heavy stages ~4x slower, so it is off by default. tracemalloc
+counts every thread, so in a pipelined run the memory figures of
+overlapping stages include each other's allocations.
+"""
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+
+_RECORDER = None  # the current run's Recorder, if any
+_NOTHING = contextlib.nullcontext()
+
+
+class Recorder:
+    """Collects (stage, course, batch, seconds, alloc bytes, peak bytes)."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.started = time.time()
+        self.records = []
+        self._current = threading.local()  # .batch = (course, batch_num)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            alloc = peak = None
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                alloc, peak = current - before, peak - before
+            course, batch_num = getattr(self._current, "batch", (None, None))
+            self.records.append((name, course, batch_num, elapsed, alloc, peak))
+
+    @contextlib.contextmanager
+    def in_batch(self, course, batch_num):
+        self._current.batch = (course, batch_num)
+        try:
+            yield
+        finally:
+            self._current.batch = (None, None)
+
+
+def start(trace_memory=False):
+    """Starts recording in this process; returns the Recorder."""
+    global _RECORDER
+    _RECORDER = Recorder(trace_memory)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return _RECORDER
+
+
+def stop():
+    """Stops recording; returns the Recorder (None if none was running)."""
+    global _RECORDER
+    recorder, _RECORDER = _RECORDER, None
+    if recorder is not None and recorder.trace_memory:
+        tracemalloc.stop()
+    return recorder
+
+
+def active():
+    """Options to start a matching recorder in a worker, or None."""
+    if _RECORDER is None:
+        return None
+    return {"trace_memory": _RECORDER.trace_memory}
+
+
+def stage(name):
+    """Context manager timing one stage of the current batch."""
+    if _RECORDER is None:
+        return _NOTHING
+    return _RECORDER.stage(name)
+
+
+def batch(course, batch_num):
+    """Context manager attributing the stages inside it to one batch."""
+    if _RECORDER is None:
+        return _NOTHING
+    return _RECORDER.in_batch(course, batch_num)
+
+
+def take():
+    """Hands over (and forgets) everything recorded so far."""
+    if _RECORDER is None:
+        return []
+    records, _RECORDER.records = _RECORDER.records, []
+    return records
+
+
+def add(records):
+    """Adds records taken in a worker to this process's recorder."""
+    if _RECORDER is not None:
+        _RECORDER.records.extend(records)
+
+
+def _totals(records, trace_memory):
+    totals = {}
+    for name, _, _, seconds, alloc, peak in records:
+        total = totals.setdefault(name, {"count": 0, "seconds": 0.0})
+        total["count"] += 1
+        total["seconds"] += seconds
+        if trace_memory:
+            total["alloc_kb"] = total.get("alloc_kb", 0) + alloc / 1024
+            total["peak_kb"] = max(total.get("peak_kb", 0), peak / 1024)
+    for total in totals.values():
+        total["seconds"] = round(total["seconds"], 4)
+        for key in ("alloc_kb", "peak_kb"):
+            if key in total:
+                total[key] = round(total[key], 1)
+    return totals
+
+
+def build_report(recorder, wall, options):
+    """The JSON run report: totals per stage, per course and per batch."""
+    records = recorder.records
+    by_course = {}
+    for record in records:
+        if record[1] is not None:
+            by_course.setdefault(record[1], []).append(record)
+    rows = []
+    for name, course, batch_num, seconds, alloc, peak in records:
+        row = {"stage": name, "course": course, "batch": batch_num, "ms": round(seconds * 1000, 2)}
+        if recorder.trace_memory:
+            row["alloc_kb"] = round(alloc / 1024, 1)
+            row["peak_kb"] = round(peak / 1024, 1)
+        rows.append(row)
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(recorder.started)),
+        "wall_s": round(wall, 3),
+        "options": options,
+        "trace_memory": recorder.trace_memory,
+        "stages": _totals(records, recorder.trace_memory),
+        "courses": {course: _totals(course_records, recorder.trace_memory)
+                    for course, course_records in sorted(by_course.items())},
+        "records": rows,
+    }
+
+
+def write_report(path, report):
+    """Saves a run report and prints where the time went."""
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    total = sum(stage["seconds"] for stage in report["stages"].values()) or 1.0
+    print(f"Run report: {path} ({report['wall_s']:.2f}s wall)")
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        memory = f", peak {stage['peak_kb'] / 1024:.1f}MB" if "peak_kb" in stage else ""
+        print(f"  {name:10} {stage['seconds']:8.2f}s {stage['seconds'] / total:5.0%} "
+              f"in {stage['count']} call(s){memory}")
@@ -0,0 +1,227 @@
+"""Field inventory: every field of a template, saved once per file hash.
+
+For each fully-qualified field name the inventory records its type (/Tx,
+/Btn, ...), /MaxLen, /Ff flags and every widget as (page, rect); text
+fields also get their font and size (/DA) and the distinct widget sizes,
+and the fonts' character widths are kept alongside, which is all
+validate.py needs to check a roster. It is written to
+field_inventory/<sha256>.json the first time a template is seen and read
+back in milliseconds after that, so nothing walks the AcroForm
+tree again until the PDF itself changes.
+
+    python -m lss_forms.inventory show 95efa_on2014.pdf
+    python -m lss_forms.inventory diff old_form.pdf new_form.pdf [--course efa]
+
+diff reports the profile-mapped fields that vanished, moved, changed type
+or got a shorter MaxLen in the new revision, and counts the rest.
+"""
+import argparse
+import json
+import os
+
+from pypdf import PdfReader
+from pypdf.generic import DictionaryObject, IndirectObject
+
+from lss_forms.appearance import PLANS_AVAILABLE, _font_metrics
+from lss_forms.fields import _widget_field, profile_field_names, qualified_name
+from lss_forms.manifest import file_hash
+
+# --- CONFIGURATION ---
+INVENTORY_FOLDER = "field_inventory/"
+# Bumped whenever an inventory gains something; older files are rebuilt.
+INVENTORY_FORMAT = 2
+# A widget that shifts by more than this many points counts as moved.
+MOVE_TOLERANCE = 2
+
+# --- CACHE ---
+_INVENTORIES = {}  # sha256 -> inventory
+
+
+def _inherited(field, key):
+    # /FT, /Ff and /MaxLen may sit on any ancestor of the widget.
+    seen = set()
+    while field is not None and id(field) not in seen:
+        seen.add(id(field))
+        if key in field:
+            return field[key]
+        field = field["/Parent"].get_object() if "/Parent" in field else None
+    return None
+
+
+def _text_font(annotation, acro_form):
+    # [font name, size] from the widget's /DA ("/Helv 0 Tf 0 g"): the two
+    # operands of its last Tf. Size 0 means auto-sized.
+    default_appearance = annotation.get_inherited("/DA", acro_form.get("/DA", None))
+    tokens = str(default_appearance.get_object() if default_appearance else "/Helv 0 Tf 0 g").split()
+    for i in range(len(tokens) - 1, 1, -1):
+        if tokens[i] == "Tf" and tokens[i - 2].startswith("/"):
+            try:
+                return [tokens[i - 2], float(tokens[i - 1])]
+            except ValueError:
+                return None
+    return None
+
+
+def _font_widths(path, acro_form, font_names):
+    # {font name: {"widths": {char: width}, "default": width, "leading": ...}}
+    # for the /DR fonts text fields use; composite fonts are left out, and
+    # all of them when appearance.py cannot read fonts with this pypdf.
+    if not PLANS_AVAILABLE:
+        return {}
+    resources = acro_form.get("/DR", DictionaryObject()).get("/Font", DictionaryObject())
+    fonts = {}
+    for font_name in sorted(font_names):
+        ref = resources.raw_get(font_name) if font_name in resources else None
+        if not isinstance(ref, IndirectObject):
+            continue
+        metrics = _font_metrics(path, font_name, ref, incremental=True)
+        if metrics["type0"]:
+            continue
+        widths, default_width = metrics["widths"], metrics["default_width"]
+        fonts[font_name] = {
+            "widths": {char: widths.get(metrics["reverse_cmap"].get(char, char), default_width)
+                       for char in sorted(metrics["safe"])},
+            "default": default_width,
+            "leading": metrics["leading"],
+        }
+    return fonts
+
+
+def build_inventory(path):
+    """Reads a template and returns ({field name: entry}, fonts) (see module doc)."""
+    reader = PdfReader(path)
+    acro_form = reader.trailer["/Root"].get("/AcroForm", DictionaryObject())
+    fields = {}
+    for page_index, page in enumerate(reader.pages):
+        for annot in page.get("/Annots", ()):
+            annotation = annot.get_object()
+            if annotation.get("/Subtype") != "/Widget":
+                continue
+            field = _widget_field(annotation)
+            name = qualified_name(field)
+            max_len = _inherited(field, "/MaxLen")
+            entry = fields.setdefault(name, {
+                "type": _inherited(field, "/FT"),
+                "max_len": int(max_len) if max_len is not None else None,
+                "flags": int(_inherited(field, "/Ff") or 0),
+                "widgets": [],
+            })
+            rect = [float(v) for v in annotation.get("/Rect", ())]
+            entry["widgets"].append([page_index + 1, [round(v, 2) for v in rect]])
+            if entry["type"] == "/Tx" and len(rect) == 4:
+                # Unrounded, since text is sized to the exact box (appearance.py).
+                entry.setdefault("font", _text_font(annotation, acro_form))
+                box = [round(abs(rect[2] - rect[0]), 4), round(abs(rect[3] - rect[1]), 4)]
+                if box not in entry.setdefault("boxes", []):
+                    entry["boxes"].append(box)
+    font_names = {entry["font"][0] for entry in fields.values() if entry.get("font")}
+    return fields, _font_widths(path, acro_form, font_names)
+
+
+def load_inventory(path):
+    """Inventory of a template, from field_inventory/ when already built."""
+    digest = file_hash(path)
+    inventory = _INVENTORIES.get(digest)
+    if inventory is not None:
+        return inventory
+
+    cache = os.path.join(INVENTORY_FOLDER, f"{digest}.json")
+    if os.path.exists(cache):
+        with open(cache) as f:
+            inventory = json.load(f)
+    if inventory is None or inventory.get("format") != INVENTORY_FORMAT:
+        fields, fonts = build_inventory(path)
+        inventory = {"format": INVENTORY_FORMAT, "template": os.path.basename(path),
+                     "sha256": digest, "fields": fields, "fonts": fonts}
+        os.makedirs(INVENTORY_FOLDER, exist_ok=True)
+        with open(cache, "w") as f:
+            json.dump(inventory, f)
+    _INVENTORIES[digest] = inventory
+    return inventory
+
+
+def _moved(old_widgets, new_widgets):
+    if len(old_widgets) != len(new_widgets):
+        return True
+    for (old_page, old_rect), (new_page, new_rect) in zip(sorted(old_widgets), sorted(new_widgets)):
+        if old_page != new_page:
+            return True
+        if any(abs(a - b) > MOVE_TOLERANCE for a, b in zip(old_rect, new_rect)):
+            return True
+    return False
+
+
+def diff_inventories(old, new, mapped=()):
+    """Compares two inventories; returns (problems, summary) as text lines.
+
+    problems only concern the names in mapped, i.e. fields a profile
+    writes to; everything else is summarized in counts.
+    """
+    old_fields, new_fields = old["fields"], new["fields"]
+    problems = []
+    for name in dict.fromkeys(mapped):
+        if name not in old_fields:
+            continue
+        before = old_fields[name]
+        after = new_fields.get(name)
+        if after is None:
+            problems.append(f"VANISHED: {name}")
+            continue
+        if before["type"] != after["type"]:
+            problems.append(f"TYPE: {name} {before['type']} -> {after['type']}")
+        if after["max_len"] is not None and (before["max_len"] is None or after["max_len"] < before["max_len"]):
+            problems.append(f"MAXLEN: {name} {before['max_len']} -> {after['max_len']}")
+        if _moved(before["widgets"], after["widgets"]):
+            where = ", ".join(f"p{page} {rect}" for page, rect in after["widgets"])
+            problems.append(f"MOVED: {name} -> {where}")
+
+    mapped = set(mapped)
+    removed = [name for name in old_fields if name not in new_fields]
+    added = [name for name in new_fields if name not in old_fields]
+    moved = [name for name in old_fields
+             if name in new_fields and _moved(old_fields[name]["widgets"], new_fields[name]["widgets"])]
+    summary = [
+        f"{len(old_fields)} -> {len(new_fields)} fields",
+        f"{len(removed)} removed ({len(mapped.intersection(removed))} mapped), {len(added)} added, "
+        f"{len(moved)} moved ({len(mapped.intersection(moved))} mapped)",
+    ]
+    return problems, summary
+
+
+def main():
+    from lss_forms.engine import available_courses, load_profile
+
+    parser = argparse.ArgumentParser(prog="python -m lss_forms.inventory", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="list a template's fields")
+    show.add_argument("template")
+    diff = commands.add_parser("diff", help="compare two revisions of a template")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--course", action="append",
+                      help="profile(s) whose fields matter (default: every profile using OLD)")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        inventory = load_inventory(args.template)
+        for name, entry in inventory["fields"].items():
+            widgets = "; ".join(f"p{page} {rect}" for page, rect in entry["widgets"])
+            max_len = f" max {entry['max_len']}" if entry["max_len"] is not None else ""
+            print(f"{name}  {entry['type']}{max_len}  {widgets}")
+        return
+
+    courses = args.course or [
+        course for course in available_courses()
+        if os.path.basename(load_profile(course)["template"]) == os.path.basename(args.old)
+    ]
+    mapped = [name for course in courses for name in profile_field_names(load_profile(course))]
+    problems, summary = diff_inventories(load_inventory(args.old), load_inventory(args.new), mapped)
+    print(f"{args.old} -> {args.new}" + (f" (mapped by {', '.join(courses)})" if courses else ""))
+    for line in summary + problems:
+        print(f"  {line}")
+    if not problems:
+        print("  No mapped field vanished or moved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Incremental regeneration: skip batches whose inputs have not changed.
+
+The output folder keeps a .manifest.json recording, for every sheet it
+holds, which course produced it and a hash of everything that went into it:
+the template bytes, the host block, the profile's field mapping, the
+candidate records, the output options (e.g. flattening) and FILL_VERSION.
+A re-run only refills sheets whose hash changed, and deletes sheets of the
+same courses that no batch produces any more (e.g. the roster shrank from
+three batches to two).
+"""
+import hashlib
+import json
+import os
+
+# Bump when a change to the filling code alters output for the same inputs,
+# so every sheet is regenerated once after upgrading.
+FILL_VERSION = 1
+MANIFEST_NAME = ".manifest.json"
+
+# --- CACHE ---
+_FILE_HASHES = {}  # path -> (size, mtime, sha256)
+
+
+def file_hash(path):
+    """sha256 of a file, re-read only when its size or mtime changes."""
+    stat = os.stat(path)
+    cached = _FILE_HASHES.get(path)
+    if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        cached = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        _FILE_HASHES[path] = cached
+    return cached[2]
+
+
+def batch_hash(profile, records, options=None):
+    """Hash of every input that decides what one filled sheet looks like."""
+    template = profile["template"]
+    inputs = {
+        "fill_version": FILL_VERSION,
+        "options": options or {},
+        "template": file_hash(template) if os.path.exists(template) else None,
+        "host_data": profile["host_data"],
+        "host_field_map": profile["host_field_map"],
+        "slots": profile["slots"],
+        "output_name": profile["output_name"],
+        "records": records,
+    }
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class Manifest:
+    """Tracks which sheets in an output folder are up to date.
+
+    Wrap the job stream with changed_jobs(), fill what it yields, then call
+    finish() with the paths that were actually written.
+    """
+
+    def __init__(self, output_folder, options=None):
+        self.output_folder = output_folder
+        self.options = options or {}
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self.seen = {}  # relative path -> {"course": ..., "hash": ...}
+        self.unchanged = 0
+
+    def _relative(self, output_filename):
+        return os.path.relpath(output_filename, self.output_folder).replace(os.sep, "/")
+
+    def _prune(self, folder):
+        # Drop facility/session sub-folders left empty by a removed sheet.
+        root = os.path.abspath(self.output_folder)
+        folder = os.path.abspath(folder)
+        while folder != root and folder.startswith(root) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
+
+    def changed_jobs(self, jobs, output_path):
+        """Yields only the jobs whose sheet is missing or out of date."""
+        for profile, batch, batch_num in jobs:
+            output_filename = output_path(profile, batch_num, self.output_folder)
+            relative = self._relative(output_filename)
+            entry = {"course": profile["course"], "hash": batch_hash(profile, batch, self.options)}
+            self.seen[relative] = entry
+            if self.entries.get(relative) == entry and os.path.exists(output_filename):
+                self.unchanged += 1
+                continue
+            yield profile, batch, batch_num
+
+    def finish(self, written, courses):
+        """Records the sheets written, deletes stale ones and saves.
+
+        Only sheets belonging to the listed courses are ever deleted, so a
+        run for one course leaves the others' outputs alone.
+        """
+        written = {self._relative(path) for path in written}
+        removed = []
+        for relative, entry in list(self.entries.items()):
+            if relative in self.seen or entry.get("course") not in courses:
+                continue
+            stale = os.path.join(self.output_folder, relative)
+            if os.path.exists(stale):
+                os.remove(stale)
+                self._prune(os.path.dirname(stale))
+            removed.append(stale)
+            del self.entries[relative]
+        for relative, entry in self.seen.items():
+            if relative in written:
+                self.entries[relative] = entry
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        return removed
@@ -0,0 +1,132 @@
+"""Merged output: one PDF per course holding every batch.
+
+Each batch is filled in its own template copy as usual, then grafted into
+the course's merged writer. Only what filling touches is copied across:
+the pages, their annotations, the field tree and any appearance streams
+made for the values. Everything else (content streams, fonts, images,
+untouched appearances) still has its template object number and is shared
+with the first batch by reference, so every extra batch adds a few KB
+instead of a full copy of the form.
+
+Fields that share a name are one field in PDF, so every batch's fields are
+hung under a parent named "batch<n>" ("batch2.Name1.1.0" and so on).
+"""
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from lss_forms.templates import load_template
+
+
+def _replaced_appearances(annotation, template):
+    # pypdf refills an existing /AP /N stream by swapping in a new object
+    # under the template's number, so that number is not shareable.
+    for appearance in annotation.get("/AP", {}).values():
+        appearance = appearance if isinstance(appearance, IndirectObject) else None
+        if appearance is None or appearance.idnum > len(template._objects):
+            continue
+        original = template._objects[appearance.idnum - 1]
+        if getattr(appearance.get_object(), "_data", None) is not getattr(original, "_data", None):
+            yield appearance.idnum
+
+
+def _batch_objects(writer, template):
+    # Object numbers that hold per-batch state: pages, their /Annots, the
+    # whole field tree (widgets included) and refilled appearance streams.
+    own = set()
+
+    def visit(ref):
+        if isinstance(ref, IndirectObject):
+            if ref.idnum in own:
+                return
+            own.add(ref.idnum)
+        obj = ref.get_object()
+        own.update(_replaced_appearances(obj, template))
+        for kid in obj.get("/Kids", ()):
+            visit(kid)
+
+    for page in writer.flattened_pages:
+        own.add(page.indirect_reference.idnum)
+        annots = page.raw_get("/Annots") if "/Annots" in page else ()
+        if isinstance(annots, IndirectObject):
+            own.add(annots.idnum)
+        for annot in page.get("/Annots", ()):
+            visit(annot)
+    # A flattened copy has no /AcroForm left.
+    for field in writer._root_object.get("/AcroForm", DictionaryObject()).get("/Fields", ()):
+        visit(field)
+    return own
+
+
+def _graft(obj, merged, memo, own, shared_limit):
+    # Copies obj into merged. References to untouched template objects are
+    # re-pointed at the merged writer's object with the same number.
+    if isinstance(obj, IndirectObject):
+        if obj.idnum <= shared_limit and obj.idnum not in own:
+            return IndirectObject(obj.idnum, 0, merged)
+        ref = memo.get(obj.idnum)
+        if ref is None:
+            # Reserve the number first: widgets point back at their page.
+            ref = memo[obj.idnum] = merged._add_object(NullObject())
+            copy = _graft(obj.get_object(), merged, memo, own, shared_limit)
+            merged._objects[ref.idnum - 1] = copy
+            copy.indirect_reference = ref
+        return ref
+    if isinstance(obj, DictionaryObject):
+        new = obj.__class__.__new__(obj.__class__)
+        new.__dict__.update(obj.__dict__)
+        if "pdf" in new.__dict__:
+            new.pdf = merged
+        dict.__init__(new, ((k, _graft(v, merged, memo, own, shared_limit)) for k, v in obj.items()))
+        return new
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_graft(v, merged, memo, own, shared_limit) for v in obj)
+    return obj
+
+
+def _add_batch_field(merged, kids, batch_num):
+    parent = DictionaryObject({
+        NameObject("/T"): TextStringObject(f"batch{batch_num}"),
+        NameObject("/Kids"): ArrayObject(kids),
+    })
+    parent_ref = merged._add_object(parent)
+    for kid in kids:
+        kid.get_object()[NameObject("/Parent")] = parent_ref
+    merged._root_object["/AcroForm"]["/Fields"].append(parent_ref)
+
+
+def start_merged(writer, batch_num=1):
+    """Turns a filled batch writer into the merged writer for its course."""
+    fields = writer._root_object["/AcroForm"]["/Fields"]
+    kids = list(fields)
+    del fields[:]
+    _add_batch_field(writer, kids, batch_num)
+    return writer
+
+
+def merge_batch(merged, writer, batch_num, template, incremental=False):
+    """Appends a filled batch (a copy of template, loaded with incremental)
+    to a merged writer."""
+    template = load_template(template, incremental)
+    shared_limit = len(template._objects)
+    own = _batch_objects(writer, template)
+    memo = {}
+
+    pages = merged._pages.get_object()
+    for page in writer.flattened_pages:
+        ref = _graft(page.indirect_reference, merged, memo, own, shared_limit)
+        pages["/Kids"].append(ref)
+        pages[NameObject("/Count")] = NumberObject(pages["/Count"] + 1)
+        merged.flattened_pages.append(ref.get_object())
+
+    kids = [
+        _graft(field, merged, memo, own, shared_limit)
+        for field in writer._root_object["/AcroForm"]["/Fields"]
+    ]
+    _add_batch_field(merged, kids, batch_num)
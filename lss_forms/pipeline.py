@@ -0,0 +1,179 @@
+"""Pipelined filling: the next batch is prepared while the last is written.
+
+engine.fill_jobs() runs each batch's steps back to back: pull the job
+(reading and normalizing roster chunks when streaming), fill the fields,
+serialize, save. Here each step is a stage of an asyncio pipeline and
+the stages hand batches on through bounded queues:
+
+    read    pull the next (profile, records, batch_num) from the jobs
+    fill    clone the template and write the fields (and flatten)
+    write   serialize the PDF to bytes
+    save    hand the bytes to the sink
+
+Every stage does its blocking work on its own thread, one batch at a
+time, so batches stay in order and the sheets are exactly those of a
+serial run. At most QUEUE_SIZE batches wait between two stages, so
+memory stays fixed however long the roster is.
+
+pypdf is pure Python and holds the GIL, so on threads fill and write
+take turns on one core; what overlaps with them is the waiting: disk
+and pipe writes, zlib, the roster reads. With processes=N fill and write
+run together, as one step, in a pool of N processes (initialized like
+engine.fill_jobs_parallel's) while this process reads and saves.
+"""
+import asyncio
+import functools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from lss_forms import instrument
+from lss_forms.engine import _batch_pdf_timed, _init_worker, _pdf_bytes, batch_name, fill_writer
+from lss_forms.flatten import flatten_writer
+
+# --- CONFIGURATION ---
+# Batches allowed to wait between two stages (per worker with processes).
+QUEUE_SIZE = 2
+
+_END = object()  # closes a stage's queue
+
+
+def _fill(flatten, append, job):
+    profile, records, batch_num = job
+    with instrument.batch(profile["course"], batch_num):
+        writer = fill_writer(profile, records, append)
+        if writer is None:
+            return None
+        if flatten:
+            with instrument.stage("flatten"):
+                flatten_writer(writer)
+    return profile, batch_num, writer
+
+
+def _write(append, item):
+    profile, batch_num, writer = item
+    with instrument.batch(profile["course"], batch_num):
+        with instrument.stage("write"):
+            return profile, batch_num, _pdf_bytes(writer, profile["template"] if append else None)
+
+
+def _fill_and_write(flatten, append, job):
+    # The fill and write stages in one call, for a pool worker.
+    profile, records, batch_num = job
+    _, data, cpu, taken = _batch_pdf_timed(profile, records, batch_num, flatten, append)
+    return profile, batch_num, data, (cpu, taken)
+
+
+def _save(sink, busy, item):
+    profile, batch_num, data, *worker = item
+    if worker:
+        # Worker CPU time and stage records, sent back from the pool.
+        cpu, taken = worker[0]
+        busy["fill+write"] += cpu
+        instrument.add(taken)
+    if data is None:
+        return None
+    with instrument.batch(profile["course"], batch_num):
+        with instrument.stage("save"):
+            output_filename = sink.write(batch_name(profile, batch_num), data)
+    print(f"Generated: {output_filename}")
+    return output_filename
+
+
+def _busy(busy, name, function, *args):
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        busy[name] += time.perf_counter() - start
+
+
+async def _read(jobs, executor, busy, outbox):
+    loop = asyncio.get_running_loop()
+    while True:
+        job = await loop.run_in_executor(executor, _busy, busy, "read", next, jobs, None)
+        if job is None:
+            break
+        done = loop.create_future()
+        done.set_result(job)
+        await outbox.put(done)
+    await outbox.put(_END)
+
+
+async def _stage(name, function, executor, busy, inbox, outbox):
+    # Items are futures of the previous stage's results, queued in order,
+    # so a pool can work on several while the next stage takes them in turn.
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await inbox.get()
+        if item is _END:
+            break
+        result = await item
+        if result is None:
+            continue
+        if isinstance(executor, ProcessPoolExecutor):
+            future = loop.run_in_executor(executor, function, result)
+        else:
+            future = loop.run_in_executor(executor, _busy, busy, name, function, result)
+        await outbox.put(future)
+    await outbox.put(_END)
+
+
+async def _collect(inbox, written):
+    while True:
+        item = await inbox.get()
+        if item is _END:
+            return
+        output_filename = await item
+        if output_filename is not None:
+            written.append(output_filename)
+
+
+async def _pipeline(jobs, sink, flatten, append, processes, templates, busy, written):
+    threads = {name: ThreadPoolExecutor(1, thread_name_prefix=f"pipeline-{name}")
+               for name in ("read", "fill", "write", "save")}
+    queue_size = QUEUE_SIZE * max(processes, 1)
+    queues = [asyncio.Queue(queue_size) for _ in range(4)]
+    if processes:
+        quiet = sys.stdout is not sys.__stdout__
+        pool = ProcessPoolExecutor(processes, initializer=_init_worker,
+                                   initargs=(templates, quiet, instrument.active(), append))
+        stages = [("fill+write", functools.partial(_fill_and_write, flatten, append), pool)]
+    else:
+        pool = None
+        stages = [("fill", functools.partial(_fill, flatten, append), threads["fill"]),
+                  ("write", functools.partial(_write, append), threads["write"])]
+    stages.append(("save", functools.partial(_save, sink, busy), threads["save"]))
+    try:
+        await asyncio.gather(
+            _read(jobs, threads["read"], busy, queues[0]),
+            *(_stage(name, function, executor, busy, queues[i], queues[i + 1])
+              for i, (name, function, executor) in enumerate(stages)),
+            _collect(queues[len(stages)], written),
+        )
+    finally:
+        for executor in [*threads.values(), pool]:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def fill_jobs_async(jobs, sink, flatten=False, processes=0, templates=(), append=False):
+    """Fills batches through the read/fill/write/save pipeline.
+
+    processes=0 runs fill and write on threads of this process; otherwise
+    they run in a pool of that many processes, which first load templates.
+    Prints the wall time next to the time each stage was busy, i.e. how
+    much of the work overlapped. Returns what was written.
+    """
+    mode = f"{processes} process(es)" if processes else "threads"
+    print(f"Filling batches in a pipeline ({mode})...")
+    stages = ("read", "fill+write", "save") if processes else ("read", "fill", "write", "save")
+    busy = dict.fromkeys(stages, 0.0)
+    written = []
+    start = time.perf_counter()
+    asyncio.run(_pipeline(iter(jobs), sink, flatten, append, processes, templates, busy, written))
+    wall = time.perf_counter() - start
+
+    busy_times = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in busy.items())
+    print(f"Wall time {wall:.2f}s; stages busy: {busy_times}")
+    return written
@@ -0,0 +1,297 @@
+"""Roster loading and normalization.
+
+normalize_roster() turns the registration export into one record per
+candidate, keyed like the profile slots ("name", "addr", ..., "dd", "mm",
+"yy") plus the routing keys ("calendar", "session", "facility"), with every
+value already a ready-to-write string. It works on whole columns, so
+filling a batch is just slicing the list of records.
+
+Most exports are a few dozen rows, and importing pandas costs more than
+reading them. load_records() therefore reads rosters up to
+LIGHT_ROSTER_BYTES with the csv module and parses DD/MM/YYYY itself;
+pandas is imported only for bigger files, for streaming, or to parse a
+date of birth in any other format. Both paths give identical records,
+and for a roster read by path they are saved as a snapshot that later
+runs load instead while the file is unchanged (see snapshot.py).
+Streaming always reads the CSV, so that memory stays flat.
+"""
+import csv
+import datetime
+import functools
+import io
+import os
+import re
+
+from lss_forms import instrument
+
+# --- CONFIGURATION ---
+INPUT_CSV = "roster.csv"
+
+# Roster column that feeds each slot field. "name" and the DOB fields
+# ("dd", "mm", "yy") are derived from AttendeeName / DateOfBirth below.
+ROSTER_COLUMNS = {
+    "addr": "Street",
+    "city": "City",
+    "zip": "PostalCode",
+    "email": "E-mail",
+    "phone": "AttendeePhone",
+}
+# Columns that say which course sitting a row belongs to (see routing.py).
+# They are carried through to the records as-is.
+ROUTING_COLUMNS = {
+    "calendar": "CalendarName",
+    "session": "textBox4",
+    "facility": "textBox12",
+}
+# Everything normalize_roster() reads; streaming skips the other columns.
+NEEDED_COLUMNS = [
+    "AttendeeName", "DateOfBirth", *ROSTER_COLUMNS.values(), *ROUTING_COLUMNS.values()
+]
+RECORD_FIELDS = [
+    "name", "addr", "city", "zip", "email", "phone", "dd", "mm", "yy",
+    "calendar", "session", "facility",
+]
+
+# Format of every DateOfBirth in the exports seen so far (13/06/2007, 2/1/2008).
+DOB_FORMAT = "%d/%m/%Y"
+DOB_PATTERN = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+# Keep each roster's normalized records in roster_cache/ and load them from
+# there while the file is unchanged (see snapshot.py).
+ROSTER_SNAPSHOTS = True
+# Rosters up to this size (~5,000 rows) skip pandas (see load_records).
+# Past it, pandas' column-wise pass is as fast as the csv module even
+# counting its import, and holds far less than one dict per raw row.
+LIGHT_ROSTER_BYTES = 1_000_000
+
+# Cells pandas reads as missing (its default na_values); the csv path
+# blanks them too so that both paths agree.
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+# --- CACHE ---
+# Raw names and dates of birth repeat a lot (the same candidate in several
+# courses, a few thousand distinct birthdays), so parsed values are kept in
+# LRU caches of this many entries each, shared by every roster the process
+# reads: both paths, every course, every service request.
+PARSE_CACHE_SIZE = 65536
+
+
+def _size(input_csv):
+    if isinstance(input_csv, str):
+        return os.path.getsize(input_csv)
+    size = input_csv.seek(0, os.SEEK_END)
+    input_csv.seek(0)
+    return size
+
+
+def load_records(input_csv=INPUT_CSV):
+    """Reads and normalizes a roster, without pandas when it is small.
+
+    input_csv is a path or a seekable binary file (e.g. an upload). A path
+    is loaded from its snapshot when the file has not changed since it was
+    last read, and snapshotted otherwise (see snapshot.py).
+    """
+    if ROSTER_SNAPSHOTS and isinstance(input_csv, str):
+        # Imported here: snapshot.py builds on this module.
+        from lss_forms.snapshot import csv_key, load_snapshot, save_snapshot
+
+        records = load_snapshot(input_csv)
+        if records is None:
+            key = csv_key(input_csv)  # before parsing, so a later edit is not masked
+            records = _parse_records(input_csv)
+            try:
+                save_snapshot(input_csv, records, key)
+            except OSError as e:
+                print(f"WARNING: could not save a roster snapshot ({e}); parsing every run.")
+        return records
+    return _parse_records(input_csv)
+
+
+def _parse_records(input_csv):
+    if _size(input_csv) <= LIGHT_ROSTER_BYTES:
+        return normalize_rows(read_rows(input_csv))
+    return normalize_roster(read_roster(input_csv))
+
+
+def read_rows(input_csv=INPUT_CSV):
+    """Loads the roster as a list of {column: text} dicts (csv module)."""
+    with instrument.stage("read"):
+        if isinstance(input_csv, str):
+            f = open(input_csv, newline="", encoding="utf-8-sig")
+        else:
+            f = io.TextIOWrapper(input_csv, newline="", encoding="utf-8-sig")
+        try:
+            return [
+                {column: "" if value in NA_VALUES else value
+                 for column, value in row.items() if column is not None}
+                for row in csv.DictReader(f, restval="")
+            ]
+        finally:
+            if isinstance(input_csv, str):
+                f.close()
+            else:
+                f.detach()  # leave the caller's file open
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def clean_name(name):
+    """Converts 'Ausar , Lautaro' to 'Lautaro Ausar' (one value)."""
+    if "," not in name:
+        return name
+    parts = name.split(",")
+    return f"{parts[1].strip()} {parts[0].strip()}"
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def split_dob(raw_dob):
+    """(dd, mm, yy) of a day-first DateOfBirth; blanks if it is not a date."""
+    raw_dob = raw_dob.strip()
+    if not raw_dob:
+        return "", "", ""
+    match = DOB_PATTERN.fullmatch(raw_dob)
+    try:
+        if match is None:
+            raise ValueError(raw_dob)
+        day, month, year = (int(part) for part in match.groups())
+        datetime.date(year, month, day)
+    except ValueError:
+        # Same lenient parse as the pandas path; only now is pandas loaded.
+        dt = _split_dob_slow(raw_dob)
+        if dt != dt:  # NaT
+            return "", "", ""
+        day, month, year = dt.day, dt.month, dt.year
+    return f"{day:02d}", f"{month:02d}", f"{year % 100:02d}"
+
+
+def parse_cache_stats():
+    """{cache: {"hits", "misses", "size", "hit_rate"}} since the process started."""
+    stats = {}
+    for name, function in (("names", clean_name), ("dobs", split_dob), ("messy_dobs", _split_dob_slow)):
+        info = function.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits, "misses": info.misses, "size": info.currsize,
+            "hit_rate": round(info.hits / lookups, 3) if lookups else None,
+        }
+    return stats
+
+
+def normalize_rows(rows):
+    """normalize_roster() for rows from read_rows(), one row at a time."""
+    with instrument.stage("normalize"):
+        records = []
+        for row in rows:
+            dd, mm, yy = split_dob(row.get("DateOfBirth", ""))
+            record = {"name": clean_name(row.get("AttendeeName", ""))}
+            for key, column in ROSTER_COLUMNS.items():
+                record[key] = row.get(column, "")
+            record["dd"], record["mm"], record["yy"] = dd, mm, yy
+            for key, column in ROUTING_COLUMNS.items():
+                record[key] = row.get(column, "").strip()
+            records.append(record)
+        return records
+
+
+def read_roster(input_csv=INPUT_CSV):
+    """Loads the roster with every column as text and blanks for gaps."""
+    import pandas as pd
+
+    with instrument.stage("read"):
+        return pd.read_csv(input_csv, dtype=str).fillna("")
+
+
+def stream_records(input_csv=INPUT_CSV, chunk_rows=1300):
+    """Yields normalized records chunk by chunk instead of loading the file.
+
+    Only NEEDED_COLUMNS are parsed, and at most chunk_rows rows are held at
+    a time, so memory stays flat however large the export is.
+    """
+    import pandas as pd
+
+    chunks = pd.read_csv(
+        input_csv,
+        dtype=str,
+        usecols=lambda column: column in NEEDED_COLUMNS,
+        chunksize=chunk_rows,
+    )
+    with chunks:
+        while True:
+            with instrument.stage("read"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield normalize_roster(chunk.fillna(""))
+
+
+def _column(df, name):
+    import pandas as pd
+
+    if name in df.columns:
+        return df[name].fillna("").astype(str)
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def clean_names(names):
+    """Converts 'Ausar , Lautaro' to 'Lautaro Ausar' for a whole column."""
+    parts = names.str.split(",")
+    last = parts.str[0].astype(str).str.strip()
+    first = parts.str[1].fillna("").astype(str).str.strip()
+    swapped = first + " " + last
+    return swapped.where(names.str.contains(",", regex=False), names)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _split_dob_slow(raw_dob):
+    # Per-value fallback for anything that is not DD/MM/YYYY: the same
+    # lenient day-first parse the course scripts always used.
+    import pandas as pd
+
+    try:
+        dt = pd.to_datetime(raw_dob, dayfirst=True)
+    except (ValueError, OverflowError):
+        return pd.NaT
+    return dt
+
+
+def parse_dobs(raw_dobs):
+    """Parses a DateOfBirth column day-first; unparseable values become NaT."""
+    import pandas as pd
+
+    raw_dobs = raw_dobs.str.strip()
+    dates = pd.to_datetime(raw_dobs, format=DOB_FORMAT, errors="coerce")
+    messy = dates.isna() & (raw_dobs != "")
+    if messy.any():
+        dates = dates.astype(object)
+        dates[messy] = raw_dobs[messy].map(_split_dob_slow)
+        dates = pd.to_datetime(dates)
+    return dates
+
+
+def _two_digits(numbers, valid):
+    # Integer parts of a date as zero-padded text, blank where there is no
+    # date (much cheaper than Series.dt.strftime on large rosters).
+    return numbers.fillna(0).astype(int).astype(str).str.zfill(2).where(valid, "")
+
+
+def normalize_roster(df):
+    """Returns one ready-to-write dict per roster row (see RECORD_FIELDS)."""
+    with instrument.stage("normalize"):
+        return _normalize(df)
+
+
+def _normalize(df):
+    dates = parse_dobs(_column(df, "DateOfBirth"))
+    valid = dates.notna()
+    columns = {
+        "name": clean_names(_column(df, "AttendeeName")),
+        **{key: _column(df, column) for key, column in ROSTER_COLUMNS.items()},
+        **{key: _column(df, column).str.strip() for key, column in ROUTING_COLUMNS.items()},
+        "dd": _two_digits(dates.dt.day, valid),
+        "mm": _two_digits(dates.dt.month, valid),
+        "yy": _two_digits(dates.dt.year % 100, valid),
+    }
+    # zip over plain lists: DataFrame.to_dict("records") boxes every cell.
+    values = [columns[field].tolist() for field in RECORD_FIELDS]
+    return [dict(zip(RECORD_FIELDS, row)) for row in zip(*values)]
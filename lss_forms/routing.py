@@ -0,0 +1,151 @@
+"""Route one combined registration export to every course sheet.
+
+Each roster row carries CalendarName (course), textBox4 (session) and
+textBox12 (facility). route_jobs() groups rows by those three in a single
+pass and turns each group into batches for the matching course profile,
+with that facility's host block and its own output sub-folder:
+
+    filled_forms/<facility>/Session <n>/Bronze_Cross_Test_Sheet_1.pdf
+
+Courses are matched through each profile's "calendar_names" patterns and
+facilities through facilities/*.json "roster_names" (both fnmatch-style,
+case-insensitive). Rows whose course has no profile are skipped and
+counted. A facility without a file keeps the course profile's host data
+except for its FACILITY_KEYS, which name the course's own facility: the
+facility name comes from the roster and the rest are left blank. Runs and
+--check --route warn about every such facility (unmatched_facilities).
+"""
+import json
+import os
+import re
+from fnmatch import fnmatch
+
+# --- CONFIGURATION ---
+FACILITY_FOLDER = "facilities/"
+# Host keys that describe the facility rather than the host.
+FACILITY_KEYS = ("facility_name", "facility_area_code", "facility_number")
+
+
+def load_facilities():
+    """Reads every facilities/*.json (an empty list if there is no folder)."""
+    if not os.path.isdir(FACILITY_FOLDER):
+        return []
+    facilities = []
+    for filename in sorted(os.listdir(FACILITY_FOLDER)):
+        if filename.endswith(".json"):
+            with open(os.path.join(FACILITY_FOLDER, filename)) as f:
+                facilities.append(json.load(f))
+    return facilities
+
+
+def _matches(value, patterns):
+    value = value.casefold()
+    return any(fnmatch(value, pattern.casefold()) for pattern in patterns)
+
+
+def match_course(calendar_name, profiles):
+    """First profile whose calendar_names match a CalendarName, or None."""
+    for profile in profiles:
+        if _matches(calendar_name, profile.get("calendar_names", [])):
+            return profile
+    return None
+
+
+def match_facility(facility_name, facilities):
+    """First facility whose roster_names match a textBox12 value, or None."""
+    for facility in facilities:
+        if _matches(facility_name, facility.get("roster_names", [])):
+            return facility
+    return None
+
+
+def unmatched_facilities(groups, facilities):
+    """{roster facility name: group count} of the routed groups (course,
+    facility, session) whose facility no facilities/*.json matches."""
+    unmatched = {}
+    for _, facility_name, _ in groups:
+        if match_facility(facility_name, facilities) is None:
+            unmatched[facility_name] = unmatched.get(facility_name, 0) + 1
+    return unmatched
+
+
+def _folder_name(text):
+    # Keep sub-folder names legal on Windows as well.
+    return re.sub(r'[\\/:*?"<>|]+', "-", text).strip(" .") or "Unknown"
+
+
+def group_profile(profile, facility_name, session, facility=None):
+    """Copy of a course profile for one facility/session group."""
+    host_data = dict(profile["host_data"])
+    if facility is not None:
+        host_data.update(
+            (key, value)
+            for key, value in facility["host_data"].items()
+            if key in profile["host_field_map"]
+        )
+    else:
+        for key in FACILITY_KEYS:
+            if key in profile["host_field_map"]:
+                host_data[key] = facility_name if key == "facility_name" else ""
+    folder = _folder_name(facility_name or "Unknown facility")
+    if session:
+        folder = os.path.join(folder, _folder_name(f"Session {session}"))
+    return {
+        **profile,
+        "host_data": host_data,
+        "output_name": os.path.join(folder, profile["output_name"]),
+        "group": (profile["course"], facility_name, session),
+        "facility_profile": facility["name"] if facility is not None else None,
+    }
+
+
+def route_jobs(profiles, chunks, facilities=(), stats=None, skipped=None):
+    """Yields (group profile, records, batch_num) for every routed batch.
+
+    Rows are buffered per (course, session, facility) group only until a
+    batch is full, so memory is bounded by groups x batch size whatever
+    the roster size. stats (if given) is filled with
+    {group: [candidates, batches]} and skipped with {CalendarName: rows}.
+    """
+    stats = {} if stats is None else stats
+    skipped = {} if skipped is None else skipped
+    # group key (course, facility, session) -> [group profile, buffer, batch_num]
+    groups = {}
+    # raw (CalendarName, session, facility) -> that group, or None when no
+    # profile claims the CalendarName. Several CalendarNames can share a group.
+    routes = {}
+
+    def flush(group):
+        routed, buffer, batch_num = group
+        group[1] = []
+        group[2] = batch_num + 1
+        counts = stats.setdefault(routed["group"], [0, 0])
+        counts[0] += len(buffer)
+        counts[1] += 1
+        return routed, buffer, group[2]
+
+    for records in chunks:
+        for record in records:
+            route = (record["calendar"], record["session"], record["facility"])
+            if route not in routes:
+                profile = match_course(record["calendar"], profiles)
+                group = None
+                if profile is not None:
+                    key = (profile["course"], record["facility"], record["session"])
+                    group = groups.get(key)
+                    if group is None:
+                        facility = match_facility(record["facility"], facilities)
+                        routed = group_profile(profile, record["facility"], record["session"], facility)
+                        group = groups[key] = [routed, [], 0]
+                routes[route] = group
+            group = routes[route]
+            if group is None:
+                skipped[record["calendar"]] = skipped.get(record["calendar"], 0) + 1
+                continue
+            group[1].append(record)
+            if len(group[1]) == group[0]["batch_size"]:
+                yield flush(group)
+
+    for group in groups.values():
+        if group[1]:
+            yield flush(group)
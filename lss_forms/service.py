@@ -0,0 +1,159 @@
+"""Local HTTP fill service: upload a roster, get a zip of filled sheets.
+
+    python -m lss_forms.service                 # http://127.0.0.1:5000/
+    python -m lss_forms.service --port 8080 --workers 4
+
+Every template is parsed once at start-up, in this process and in each
+pool worker, so a request only pays for filling. Requests are handled on
+threads and share one process pool, so several staff can upload at once
+and batches from all of them are filled side by side.
+
+    POST /fill   multipart form:
+                 roster   the registration export (CSV)
+                 course   profile name, repeatable (default: every course)
+                 route    "1" to split by CalendarName/facility/session
+                 flatten  "1" to bake values into the page
+    -> application/zip, streamed as batches finish
+    GET /health  loaded courses, pool size and roster parsing cache hits
+"""
+import argparse
+import csv
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from lss_forms.engine import (
+    _init_worker,
+    available_courses,
+    batch_name,
+    batch_pdf,
+    iter_jobs,
+    load_profile,
+    report_missing_fields,
+)
+from lss_forms.roster import load_records, parse_cache_stats
+from lss_forms.routing import load_facilities, route_jobs
+from lss_forms.sinks import ChunkBuffer, ZipSink
+
+UPLOAD_FORM = """<!doctype html>
+<title>LSS test sheets</title>
+<h1>Fill test sheets</h1>
+<form method="post" action="/fill" enctype="multipart/form-data">
+  <p><input type="file" name="roster" accept=".csv" required></p>
+  <p>{courses}</p>
+  <p><label><input type="checkbox" name="route" value="1"> Split by course, facility and session</label></p>
+  <p><label><input type="checkbox" name="flatten" value="1"> Flatten (no editable fields)</label></p>
+  <p><button>Fill</button></p>
+</form>
+"""
+
+
+def _fill_entry(profile, records, batch_num, flatten):
+    # Runs in a pool worker; returns the zip entry name and the PDF.
+    return batch_name(profile, batch_num), batch_pdf(profile, records, flatten)
+
+
+def zip_batches(pool, jobs, flatten=False, window=8):
+    """Yields a zip archive chunk by chunk as the pool fills the batches.
+
+    At most window batches are in flight, and entries are written in job
+    order, so the archive is the same whatever order the workers finish in.
+    """
+    buffer = ChunkBuffer()
+    with ZipSink(buffer, background=False) as archive:
+        pending = deque()
+        jobs = iter(jobs)
+        while True:
+            for profile, batch, batch_num in jobs:
+                pending.append(pool.submit(_fill_entry, profile, batch, batch_num, flatten))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            name, data = pending.popleft().result()
+            if data is not None:
+                archive.write(name, data)
+                yield buffer.take()
+    yield buffer.take()
+
+
+def create_app(workers=None):
+    """Builds the app with every course profile and template preloaded."""
+    app = Flask(__name__)
+    profiles = {course: load_profile(course) for course in available_courses()}
+    templates = sorted({profile["template"] for profile in profiles.values()})
+    _init_worker(templates)
+    for profile in profiles.values():
+        report_missing_fields(profile)
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(templates,))
+    # Start every worker now so the first request doesn't parse templates.
+    for future in [pool.submit(_init_worker, ()) for _ in range(workers)]:
+        future.result()
+    facilities = load_facilities()
+
+    @app.get("/")
+    def index():
+        courses = " ".join(
+            f'<label><input type="checkbox" name="course" value="{course}" checked> {profile["name"]}</label>'
+            for course, profile in profiles.items()
+        )
+        return UPLOAD_FORM.format(courses=courses)
+
+    @app.get("/health")
+    def health():
+        return jsonify(courses=sorted(profiles), workers=workers, parse_cache=parse_cache_stats())
+
+    @app.post("/fill")
+    def fill():
+        start = time.perf_counter()
+        upload = request.files.get("roster")
+        if upload is None:
+            return jsonify(error="no roster file uploaded"), 400
+        courses = request.form.getlist("course") or list(profiles)
+        unknown = [course for course in courses if course not in profiles]
+        if unknown:
+            return jsonify(error=f"unknown course(s): {', '.join(unknown)}"), 400
+        try:
+            records = load_records(upload.stream)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify(error=f"could not read roster: {e}"), 400
+
+        chosen = [profiles[course] for course in courses]
+        if request.form.get("route") == "1":
+            jobs = route_jobs(chosen, [records], facilities)
+        else:
+            jobs = iter_jobs(chosen, [records])
+        flatten = request.form.get("flatten") == "1"
+
+        def body():
+            yield from zip_batches(pool, jobs, flatten, window=workers * 2)
+            app.logger.info("Filled %d row(s) for %s in %.2fs", len(records),
+                            ", ".join(courses), time.perf_counter() - start)
+
+        return Response(
+            stream_with_context(body()),
+            mimetype="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="test_sheets.zip"'},
+        )
+
+    app.extensions["lss_pool"] = pool
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m lss_forms.service", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="fill processes (default: CPU count)")
+    args = parser.parse_args()
+
+    app = create_app(args.workers)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Output sinks: where filled sheets go once they are PDF bytes.
+
+Both sinks take (name, data) pairs, where name is the sheet's relative
+path (e.g. 'Centennial C.C/Session 5/SFA_Exam_Sheet_1.pdf'):
+
+    FolderSink("filled_forms/")     one file per sheet, each replaced atomically
+    ZipSink("sheets.zip")           one archive, nothing else on disk
+    ZipSink(sys.stdout.buffer)      an archive piped to another program
+
+ZipSink compresses and writes on a background thread fed through a small
+bounded queue, so the next batch is being filled while the previous one
+is deflated and written (zlib releases the GIL while it works).
+"""
+import os
+import queue
+import threading
+import zipfile
+
+
+class FolderSink:
+    """Writes each sheet to its own file under a folder."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.folder, name)
+        # Routed profiles write into per-facility/session sub-folders.
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Written beside the sheet and renamed over it, so a viewer (or a
+        # --watch rerun) never sees half a PDF.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ChunkBuffer:
+    """Write-only stream that hands back whatever was written since last time.
+
+    Lets a web response send a zip as it grows (see service.py).
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipSink:
+    """Streams sheets into a zip archive at a path or on a binary stream.
+
+    The stream does not need to be seekable (a pipe or stdout is fine).
+    With background=False entries are written in the caller's thread.
+    The filled sheets' streams are mostly compressed already: level 1
+    deflates ~25% faster than the default for a 2% bigger archive.
+    """
+
+    def __init__(self, target, background=True, queue_size=8, compresslevel=1):
+        self.name = target if isinstance(target, str) else getattr(target, "name", "<stream>")
+        self._file = open(target, "wb") if isinstance(target, str) else None
+        self.archive = zipfile.ZipFile(self._file or target, "w", zipfile.ZIP_DEFLATED,
+                                       compresslevel=compresslevel)
+        self._error = None
+        self._queue = None
+        if background:
+            self._queue = queue.Queue(queue_size)
+            self._thread = threading.Thread(target=self._drain, daemon=True)
+            self._thread.start()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    self.archive.writestr(*item)
+                except Exception as e:  # re-raised in the filling thread
+                    self._error = e
+
+    def write(self, name, data):
+        if self._error is not None:
+            raise self._error
+        name = name.replace(os.sep, "/")
+        if self._queue is None:
+            self.archive.writestr(name, data)
+        else:
+            self._queue.put((name, data))
+        return f"{self.name}:{name}"
+
+    def close(self):
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+        self.archive.close()
+        if self._file is not None:
+            self._file.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,304 @@
+"""Slot-map discovery: find every candidate slot of a form by geometry.
+
+The candidate blocks on a test sheet are the same set of boxes repeated
+down the page, so the field *positions* are far more reliable than their
+names (which on the Lifesaving forms are things like '10', a ghost
+'Address1.1.1.0X' or '13Name1.1.1.1.1.1'). discover_slots():
+
+1. collects every visible text widget with its page and /Rect;
+2. seeds the roles (name, addr, ..., dd, mm, yy) from the top-most block
+   whose field names say what they are, e.g. 'NAME 1' / 'Year 1';
+3. slides that block's layout over every page: wherever all its boxes
+   line up (within TOLERANCE points) there is a slot, whatever the
+   fields there are called;
+4. verifies that no field is used twice and that writing each field name
+   only reaches widgets inside its own slot.
+
+Results are cached in slotmaps/<template>.json keyed by the template's
+sha256, so repeat runs read the file instead of the PDF. Profiles without
+a "slots" list use the discovered map (see engine.load_profile).
+
+    python -m lss_forms.slotmap                      # every profile's template
+    python -m lss_forms.slotmap bronze_cross new.pdf # courses and/or PDFs
+"""
+import argparse
+import json
+import os
+import re
+
+from lss_forms.fields import _widget_field, field_index, qualified_name
+from lss_forms.manifest import file_hash
+from lss_forms.templates import load_template
+
+# --- CONFIGURATION ---
+SLOTMAP_FOLDER = "slotmaps/"
+# How far (in points) a box may sit from where the seed layout expects it.
+TOLERANCE = 4
+# Seed roles, matched against field names in the first block only.
+ROLE_PATTERNS = {
+    "name": r"name",
+    "addr": r"addr|street",
+    "city": r"city",
+    "zip": r"postal|zip",
+    "email": r"e-?mail",
+    "phone": r"phone|tel",
+    "dd": r"day|dobd",
+    "mm": r"month|dobm",
+    "yy": r"year|doby",
+}
+# The seed block's boxes must all sit within this many points of its name box.
+SEED_RADIUS = 60
+
+_HIDDEN = (1 << 1) | (1 << 5)
+
+
+def text_widgets(writer):
+    """[(page index, (x0, y0, x1, y1), qualified field name)] for text boxes."""
+    widgets = []
+    for page_index, page in enumerate(writer.pages):
+        for annot in page.get("/Annots", ()):
+            annotation = annot.get_object()
+            if annotation.get("/Subtype") != "/Widget" or "/Rect" not in annotation:
+                continue
+            if int(annotation.get("/F", 0)) & _HIDDEN:
+                continue
+            field = _widget_field(annotation)
+            kind = field.get("/FT")
+            if kind is None and "/Parent" in field:
+                kind = field["/Parent"].get_object().get("/FT")
+            if kind != "/Tx":
+                continue
+            x0, y0, x1, y1 = [float(v) for v in annotation["/Rect"]]
+            rect = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+            widgets.append((page_index, rect, qualified_name(field)))
+    return widgets
+
+
+def _center(rect):
+    return (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2
+
+
+def _distance(a, b):
+    (ax, ay), (bx, by) = _center(a), _center(b)
+    return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
+
+
+def _gap(a, b):
+    # Edge-to-edge distance; 0 when the boxes touch or overlap.
+    dx = max(0, a[0] - b[2], b[0] - a[2])
+    dy = max(0, a[1] - b[3], b[1] - a[3])
+    return (dx ** 2 + dy ** 2) ** 0.5
+
+
+def _suffix(name, role):
+    # What is left of a field name without its role word: 'Name1.0' and
+    # 'DOBY1.0' both leave '1.0', 'NAME 1' and 'Year 1' both leave '1'.
+    return re.sub(ROLE_PATTERNS[role], "", name, count=1, flags=re.IGNORECASE).strip(" _-").casefold()
+
+
+def _role_candidates(widgets):
+    candidates = {role: [] for role in ROLE_PATTERNS}
+    for widget in widgets:
+        for role, pattern in ROLE_PATTERNS.items():
+            if re.search(pattern, widget[2], re.IGNORECASE):
+                candidates[role].append(widget)
+                break
+    return candidates
+
+
+def seed_layout(widgets):
+    """{role: rect} of the first block whose names give every role, or None."""
+    candidates = _role_candidates(widgets)
+    # Top of the first page first.
+    for page_index, name_rect, name in sorted(candidates["name"], key=lambda w: (w[0], -w[1][3])):
+        layout = {"name": name_rect}
+        suffix = _suffix(name, "name")
+        for role, found in candidates.items():
+            if role == "name":
+                continue
+            nearby = [w for w in found if w[0] == page_index and _gap(w[1], name_rect) <= SEED_RADIUS]
+            if not nearby:
+                break
+            # Rows of neighbouring slots touch, so prefer the box numbered
+            # like the name box and only then the closest one.
+            layout[role] = min(nearby, key=lambda w: (_suffix(w[2], role) != suffix,
+                                                      _distance(w[1], name_rect)))[1]
+        else:
+            return layout
+    return None
+
+
+def _near(rect, expected):
+    return all(abs(a - b) <= TOLERANCE for a, b in zip(rect, expected))
+
+
+def _shift(rect, dx, dy):
+    return rect[0] + dx, rect[1] + dy, rect[2] + dx, rect[3] + dy
+
+
+def find_slots(widgets, layout):
+    """Every place the seed layout lines up, top to bottom, page by page.
+
+    Returns [(page index, {role: [field names]}, block rect)].
+    """
+    anchor = layout["name"]
+    by_page = {}
+    for widget in widgets:
+        by_page.setdefault(widget[0], []).append(widget)
+
+    slots = []
+    for page_index in sorted(by_page):
+        page_widgets = by_page[page_index]
+        anchors = [
+            w for w in page_widgets
+            if abs((w[1][2] - w[1][0]) - (anchor[2] - anchor[0])) <= TOLERANCE
+            and abs((w[1][3] - w[1][1]) - (anchor[3] - anchor[1])) <= TOLERANCE
+        ]
+        seen = set()
+        for _, rect, _ in sorted(anchors, key=lambda w: -w[1][3]):
+            dx, dy = rect[0] - anchor[0], rect[1] - anchor[1]
+            if (round(dx), round(dy)) in seen:
+                continue
+            roles = {}
+            for role, role_rect in layout.items():
+                expected = _shift(role_rect, dx, dy)
+                names = [w[2] for w in page_widgets if _near(w[1], expected)]
+                if not names:
+                    break
+                roles[role] = list(dict.fromkeys(names))
+            else:
+                seen.add((round(dx), round(dy)))
+                rects = [_shift(r, dx, dy) for r in layout.values()]
+                block = (
+                    min(r[0] for r in rects), min(r[1] for r in rects),
+                    max(r[2] for r in rects), max(r[3] for r in rects),
+                )
+                slots.append((page_index, roles, block))
+    return slots
+
+
+def _inside(rect, block):
+    return (rect[0] >= block[0] - TOLERANCE and rect[1] >= block[1] - TOLERANCE
+            and rect[2] <= block[2] + TOLERANCE and rect[3] <= block[3] + TOLERANCE)
+
+
+def verify_slots(template, widgets, slots):
+    """Problems with a discovered map, as readable strings (empty if none)."""
+    problems = []
+    index = field_index(template)
+    rects = {}
+    for page_index, rect, name in widgets:
+        rects.setdefault(name, []).append((page_index, rect))
+
+    used = {}
+    for number, (page_index, roles, block) in enumerate(slots, start=1):
+        for role, names in roles.items():
+            if len(names) > 1:
+                problems.append(f"slot {number} {role}: several boxes overlap ({', '.join(names)})")
+            for name in names:
+                if name in used:
+                    problems.append(f"slot {number} {role}: '{name}' is also slot {used[name]}")
+                else:
+                    used[name] = f"{number} {role}"
+                if name not in index:
+                    problems.append(f"slot {number} {role}: '{name}' cannot be written by name")
+                for other_page, rect in rects.get(name, ()):
+                    if other_page != page_index or not _inside(rect, block):
+                        problems.append(f"slot {number} {role}: writing '{name}' also fills a box "
+                                        f"on page {other_page + 1} outside the slot")
+                        break
+    return problems
+
+
+def discover_slots(template):
+    """Analyzes a template from scratch; returns the slot-map dict."""
+    widgets = text_widgets(load_template(template))
+    layout = seed_layout(widgets)
+    if layout is None:
+        return {"template": template, "slots": [], "pages": [],
+                "problems": ["no block with name, address, city, postal code, e-mail, "
+                             "phone and day/month/year fields found"]}
+    slots = find_slots(widgets, layout)
+    return {
+        "template": template,
+        "slots": [
+            {role: names[0] if len(names) == 1 else names for role, names in roles.items()}
+            for _, roles, _ in slots
+        ],
+        "pages": [page_index + 1 for page_index, _, _ in slots],
+        "problems": verify_slots(template, widgets, slots),
+    }
+
+
+def _cache_path(template):
+    return os.path.join(SLOTMAP_FOLDER, os.path.splitext(os.path.basename(template))[0] + ".json")
+
+
+def slot_map(template):
+    """The slot map of a template, from slotmaps/ if the PDF is unchanged."""
+    digest = file_hash(template)
+    cache = _cache_path(template)
+    if os.path.exists(cache):
+        with open(cache) as f:
+            cached = json.load(f)
+        if cached.get("sha256") == digest:
+            return cached
+
+    discovered = {"sha256": digest, **discover_slots(template)}
+    os.makedirs(SLOTMAP_FOLDER, exist_ok=True)
+    with open(cache, "w") as f:
+        json.dump(discovered, f, indent=1)
+    return discovered
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def compare_slots(hand_slots, discovered_slots):
+    """Differences between a profile's hand-written slots and a discovered map."""
+    differences = []
+    if len(hand_slots) != len(discovered_slots):
+        differences.append(f"{len(hand_slots)} slots in the profile, {len(discovered_slots)} found")
+    for number, (hand, found) in enumerate(zip(hand_slots, discovered_slots), start=1):
+        for role in hand.keys() | found.keys():
+            hand_names = _as_list(hand.get(role, []))
+            found_names = _as_list(found.get(role, []))
+            if hand_names != found_names:
+                differences.append(f"slot {number} {role}: profile {hand_names}, found {found_names}")
+    return differences
+
+
+def main():
+    from lss_forms.engine import available_courses, load_profile
+
+    parser = argparse.ArgumentParser(prog="python -m lss_forms.slotmap", description=__doc__.splitlines()[0])
+    parser.add_argument("targets", nargs="*", help="course names or template PDFs (default: every course)")
+    args = parser.parse_args()
+
+    for target in args.targets or available_courses():
+        profile = None
+        template = target
+        if not target.lower().endswith(".pdf"):
+            profile = load_profile(target)
+            template = profile["template"]
+        if not os.path.exists(template):
+            print(f"ERROR: Could not find {template}")
+            continue
+
+        found = slot_map(template)
+        print(f"{template}: {len(found['slots'])} slot(s) -> {_cache_path(template)}")
+        for number, (page, slot) in enumerate(zip(found["pages"], found["slots"]), start=1):
+            print(f"  {number:2} (page {page}): " + ", ".join(f"{role}={value}" for role, value in slot.items()))
+        for problem in found["problems"]:
+            print(f"  WARNING: {problem}")
+        if profile is not None and profile.get("slots"):
+            differences = compare_slots(profile["slots"], found["slots"])
+            for difference in differences:
+                print(f"  DIFFERS: {difference}")
+            if not differences:
+                print(f"  matches profiles/{target}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Roster snapshots: the normalized records saved once per roster file.
+
+Every course script, --watch rerun and repeated run used to parse the
+same roster.csv again: tokenize the CSV, then split the names and dates
+of birth. load_records() now keeps what that produces in
+roster_cache/<key>.snap (one per roster path) and later runs load the
+records straight from it:
+
+    magic    b"LSS ROSTER SNAPSHOT\\n"
+    header   length (4 bytes, little-endian), then JSON: SNAPSHOT_FORMAT,
+             the CSV's path, size, mtime and sha256, the row count and,
+             per record field, its distinct values and the index type
+    columns  per field, one little-endian array of row -> value index
+
+The columns are dictionary-encoded, so what repeats across an export
+(CalendarName, session, facility, city, the DOB parts) is stored once
+and a 100,000-row snapshot is a fraction of the CSV. A snapshot is used
+when the CSV's size and mtime match, or when only the mtime differs but
+the sha256 matches (a copy, a touch); anything else means the roster
+changed, so it is parsed again and its snapshot replaced. Bump
+SNAPSHOT_FORMAT whenever normalization changes what a record holds.
+
+Saving a snapshot also tidies the folder: snapshots of rosters that no
+longer exist, unused for SNAPSHOT_MAX_AGE_DAYS or past the SNAPSHOT_LIMIT
+most recently used are deleted (a hit counts as a use).
+"""
+import array
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+
+from lss_forms import instrument
+from lss_forms.manifest import file_hash
+from lss_forms.roster import RECORD_FIELDS
+
+# --- CONFIGURATION ---
+SNAPSHOT_FOLDER = "roster_cache/"
+SNAPSHOT_FORMAT = 2
+# Snapshots kept besides the one being saved, most recently used first.
+SNAPSHOT_LIMIT = 8
+SNAPSHOT_MAX_AGE_DAYS = 30
+
+_MAGIC = b"LSS ROSTER SNAPSHOT\n"
+# Unsigned array types by item size, smallest first.
+_INDEX_TYPES = {array.array(code).itemsize: code for code in "LIHB"}
+
+
+def snapshot_path(input_csv):
+    """Where the snapshot of a roster path is kept."""
+    key = hashlib.sha256(os.path.abspath(input_csv).encode()).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_FOLDER, f"{key}.snap")
+
+
+def csv_key(input_csv):
+    """{"size", "mtime_ns", "sha256"} of a roster file, as snapshots record it."""
+    stat = os.stat(input_csv)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash(input_csv)}
+
+
+def _index_type(count):
+    for size in (1, 2, 4):
+        if count <= 1 << (8 * size):
+            return _INDEX_TYPES[size]
+    raise ValueError(f"{count} distinct values do not fit a snapshot column")
+
+
+def save_snapshot(input_csv, records, key):
+    """Writes the snapshot of records, normalized from input_csv as it was at key."""
+    header = {"format": SNAPSHOT_FORMAT, "source": os.path.abspath(input_csv), "csv": key,
+              "rows": len(records), "columns": []}
+    blobs = []
+    for field in RECORD_FIELDS:
+        lookup = {}
+        indexes = [lookup.setdefault(record[field], len(lookup)) for record in records]
+        column = array.array(_index_type(len(lookup)), indexes)
+        if sys.byteorder == "big":
+            column.byteswap()
+        header["columns"].append({"field": field, "type": column.typecode, "values": list(lookup)})
+        blobs.append(column.tobytes())
+
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    path = snapshot_path(input_csv)
+    os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    prune_snapshots(keep=path)
+    return path
+
+
+def _read_header(f):
+    prefix = f.read(len(_MAGIC) + 4)
+    if len(prefix) < len(_MAGIC) + 4 or not prefix.startswith(_MAGIC):
+        return None
+    (length,) = struct.unpack("<I", prefix[len(_MAGIC):])
+    try:
+        header = json.loads(f.read(length))
+    except ValueError:  # damaged; snapshots are only ever replaced whole
+        return None
+    if header.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if [column["field"] for column in header["columns"]] != RECORD_FIELDS:
+        return None
+    return header
+
+
+def _fresh(header, input_csv):
+    stat = os.stat(input_csv)
+    key = header["csv"]
+    if key["size"] != stat.st_size:
+        return False
+    return key["mtime_ns"] == stat.st_mtime_ns or key["sha256"] == file_hash(input_csv)
+
+
+def load_snapshot(input_csv):
+    """The records of a roster from its snapshot; None if it has none or it is stale."""
+    path = snapshot_path(input_csv)
+    if not os.path.exists(path):
+        return None
+    with instrument.stage("snapshot"), open(path, "rb") as f:
+        header = _read_header(f)
+        if header is None or not _fresh(header, input_csv):
+            return None
+        rows = header["rows"]
+        columns = []
+        for column in header["columns"]:
+            indexes = array.array(column["type"])
+            indexes.frombytes(f.read(indexes.itemsize * rows))
+            if len(indexes) != rows:  # cut short
+                return None
+            if sys.byteorder == "big":
+                indexes.byteswap()
+            columns.append(list(map(column["values"].__getitem__, indexes)))
+    try:
+        os.utime(path)  # used: kept longest when pruning
+    except OSError:
+        pass
+    return [dict(zip(RECORD_FIELDS, row)) for row in zip(*columns)]
+
+
+def prune_snapshots(keep=None):
+    """Deletes the snapshots nothing will load again (see module doc) and
+    all but the SNAPSHOT_LIMIT most recently used; returns how many."""
+    try:
+        names = os.listdir(SNAPSHOT_FOLDER)
+    except FileNotFoundError:
+        return 0
+    snapshots = []
+    for name in names:
+        path = os.path.join(SNAPSHOT_FOLDER, name)
+        if name.endswith(".snap") and path != keep:
+            try:
+                snapshots.append((os.path.getmtime(path), path))
+            except OSError:  # pruned by another run
+                pass
+    snapshots.sort(reverse=True)
+    oldest = time.time() - SNAPSHOT_MAX_AGE_DAYS * 86400
+    removed = 0
+    for rank, (mtime, path) in enumerate(snapshots):
+        try:
+            stale = rank >= SNAPSHOT_LIMIT or mtime < oldest
+            if not stale:
+                with open(path, "rb") as f:
+                    header = _read_header(f)
+                stale = header is None or not os.path.exists(header["source"])
+            if stale:
+                os.remove(path)
+                removed += 1
+        except OSError:  # pruned by another run, or not ours to delete
+            pass
+    return removed
@@ -0,0 +1,105 @@
+"""Template cache: parse each fillable PDF once, hand out cheap copies.
+
+A template loaded with incremental=True keeps the object numbers it has in
+the file, so a filled copy can be written as an incremental update of the
+file (--append, increment.py). It also keeps everything the file holds
+(/Metadata, unused objects), which a full write would carry along, so
+every other path loads the plain way. The two are cached separately, as
+are the field indexes, appearance plans and host variants built on them.
+
+Every one of those caches is keyed by the template's sha256 as well as
+its path (manifest.file_hash, re-hashed only when the file's size or mtime
+changes), so a form replaced while the process runs (e.g. under --watch)
+is parsed again instead of filled from the old one.
+"""
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+from lss_forms import instrument
+from lss_forms.manifest import file_hash
+
+# --- CACHE ---
+# Keyed by (template path, template sha256, incremental). Each value is a
+# pristine PdfWriter that is never filled or written; batches only ever
+# receive copies of it.
+_TEMPLATES = {}
+
+
+def load_template(path, incremental=False):
+    """Returns the pristine writer for a template, parsing it on first use.
+
+    incremental=True keeps the file's object numbers (see module doc).
+    """
+    key = (path, file_hash(path), incremental)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        for stale in [k for k in _TEMPLATES if k[0] == path and k[1] != key[1]]:
+            del _TEMPLATES[stale]  # the file has been replaced
+        with instrument.stage("template"):
+            if incremental:
+                # pypdf's incremental mode loads every object under its own number.
+                template = PdfWriter(path, incremental=True)
+                template.incremental = False
+                template._reader = None
+                for i, obj in enumerate(template._objects):
+                    # Object and xref streams only pack objects loaded above.
+                    if isinstance(obj, StreamObject) and obj.get("/Type") in ("/ObjStm", "/XRef"):
+                        template._objects[i] = None
+            else:
+                template = PdfWriter()
+                template.append(PdfReader(path))
+        _TEMPLATES[key] = template
+    return template
+
+
+def _copy_object(obj, writer):
+    # Indirect references are re-pointed at the new writer so that nothing
+    # written into the copy can reach back into the pristine template.
+    if isinstance(obj, IndirectObject):
+        return IndirectObject(obj.idnum, obj.generation, writer)
+    if isinstance(obj, DictionaryObject):
+        # Covers pages and streams too. Stream data (fonts, images, page
+        # content) is immutable bytes, so the copy shares it by reference.
+        new = obj.__class__.__new__(obj.__class__)
+        new.__dict__.update(obj.__dict__)
+        if "pdf" in new.__dict__:
+            new.pdf = writer
+        dict.__init__(new, ((k, _copy_object(v, writer)) for k, v in obj.items()))
+        return new
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_copy_object(v, writer) for v in obj)
+    # Names, numbers and strings are immutable and can be shared as-is.
+    return obj
+
+
+def clone_template(path, incremental=False):
+    """Returns a fresh, fillable PdfWriter copied from the cached template."""
+    return copy_writer(load_template(path, incremental))
+
+
+def copy_writer(template):
+    """Returns a fresh copy of a pristine writer (a template or a variant)."""
+    writer = PdfWriter()
+    writer._objects = [
+        None if obj is None else _copy_object(obj, writer)
+        for obj in template._objects
+    ]
+    for idnum, obj in enumerate(writer._objects, start=1):
+        if obj is not None and hasattr(obj, "indirect_reference"):
+            obj.indirect_reference = IndirectObject(idnum, 0, writer)
+    root_id = template._root_object.indirect_reference.idnum
+    writer._root_object = writer._objects[root_id - 1]
+    writer._pages = _copy_object(template._pages, writer)
+    writer._info_obj = _copy_object(template._info_obj, writer)
+    writer._ID = template._ID
+    writer.flattened_pages = [
+        writer._objects[page.indirect_reference.idnum - 1]
+        for page in template.flattened_pages
+    ]
+    return writer
+
+
+def clear_templates():
+    """Drops every cached template (e.g. to time a cold start)."""
+    _TEMPLATES.clear()
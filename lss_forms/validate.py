@@ -0,0 +1,248 @@
+"""Dry run: check a roster against the course forms without filling any.
+
+    python -m lss_forms --check                  # every course, whole roster
+    python -m lss_forms --check --route sfa      # as --route would split it
+
+Nothing is cloned, filled or written. The roster is read and normalized
+as for a real run and each value is measured against the template's field
+inventory (inventory.py: /MaxLen, comb and multi-line flags, widget size,
+font and glyph widths, cached on disk per template hash), sized the way
+appearance.py would draw it. Per candidate and slot it reports:
+
+    ERROR    a DateOfBirth that is not a date (the DOB boxes stay blank)
+    ERROR    a value longer than the field's /MaxLen or comb boxes
+    ERROR    text too wide for its box even at MIN_FONT_SIZE (cut off)
+    WARNING  text shrunk below LEGIBLE_FONT_SIZE to fit
+    WARNING  characters the field's font cannot draw
+    WARNING  a candidate without a name or a date of birth
+
+and per course how many sheets of batch_size slots the candidates take,
+the profile fields the template lacks and, with --route, the rows no
+course claims and the facilities without a facilities/*.json. With
+--route only the rows routed to a sheet are checked; the others are
+listed by row number under their CalendarName. The host block is checked
+like a slot.
+"""
+import os
+import time
+
+from lss_forms.appearance import _COMB, _MULTILINE, MIN_FONT_SIZE, fitted_size
+from lss_forms.engine import host_data_map, iter_jobs, load_profile
+from lss_forms.fields import profile_field_names
+from lss_forms.inventory import load_inventory
+from lss_forms.roster import INPUT_CSV, normalize_rows, read_rows
+from lss_forms.routing import load_facilities, route_jobs, unmatched_facilities
+
+# --- CONFIGURATION ---
+# Text drawn smaller than this (points) is reported as hard to read.
+LEGIBLE_FONT_SIZE = 6.0
+
+# Row numbers listed per skipped CalendarName before "and N more".
+_LISTED_ROWS = 10
+
+# Slot keys as named in the report.
+_LABELS = {
+    "name": "Name", "addr": "Address", "city": "City", "zip": "Postal code",
+    "email": "E-mail", "phone": "Phone", "dd": "DOB day", "mm": "DOB month", "yy": "DOB year",
+}
+
+
+def field_specs(template):
+    """{field name: spec} for a template's text fields, from its inventory.
+
+    A spec holds what check_value() needs: max_len, comb, multiline, the
+    (width, height) of its widgets, the /DA size and the font's widths
+    (None when the inventory has none, e.g. a composite font). Fields are
+    listed under their full name and, like field_index(), their last part.
+    """
+    inventory = load_inventory(template)
+    fonts = inventory["fonts"]
+    specs = {}
+    partial = {}
+    for name, entry in inventory["fields"].items():
+        if entry["type"] != "/Tx" or not entry.get("boxes"):
+            continue
+        font_name, font_size = entry.get("font") or (None, 0)
+        specs[name] = {
+            "max_len": entry["max_len"],
+            "comb": bool(entry["flags"] & _COMB),
+            "multiline": bool(entry["flags"] & _MULTILINE),
+            "boxes": entry["boxes"],
+            "font_size": font_size,
+            "font": fonts.get(font_name),
+        }
+        partial.setdefault(name.rsplit(".", 1)[-1], specs[name])
+    return {**partial, **specs}
+
+
+def check_value(spec, text):
+    """[(level, message)] for one value in one field; [] if it fits."""
+    if not text:
+        return []
+    issues = []
+    if spec["max_len"] is not None and len(text) > spec["max_len"]:
+        boxes = "comb boxes" if spec["comb"] else "characters"
+        issues.append(("ERROR", f"{len(text)} characters, the field takes {spec['max_len']} {boxes}"))
+    font = spec["font"]
+    if spec["comb"] or spec["multiline"] or font is None:
+        return issues
+
+    widths, default_width = font["widths"], font["default"]
+    missing = "".join(sorted(set(text).difference(widths)))
+    if missing:
+        issues.append(("WARNING", f"the form's font has no {missing!r}"))
+    text_width = sum([widths.get(char, default_width) for char in text], 0.0)
+    # Each widget is drawn on its own: report the box the text fits worst.
+    sizes = []
+    for width, height in spec["boxes"]:
+        # Same box and sizing as appearance.stream_data().
+        field_width = width - 4
+        font_size = fitted_size(spec["font_size"], text_width, field_width, height, font["leading"])
+        drawn = text_width * font_size / 1000
+        # Fitted sizes are rounded to 0.1pt, so a line that fits can still
+        # overrun its box by up to 0.05pt's worth of width.
+        if drawn - field_width > text_width * 0.05 / 1000 + 0.01:
+            issues.append(("ERROR", f"cut off: {drawn:.0f}pt wide at {font_size:g}pt "
+                                    f"in a {field_width:.0f}pt box"))
+            return issues
+        sizes.append(font_size)
+    if min(sizes) < LEGIBLE_FONT_SIZE <= (spec["font_size"] or LEGIBLE_FONT_SIZE):
+        issues.append(("WARNING", f"shrunk to {min(sizes):g}pt to fit"))
+    return issues
+
+
+def _field_issues(specs, pdf_fields, text):
+    # A slot key can feed several fields (a list); report each problem once.
+    issues = []
+    for name in pdf_fields if isinstance(pdf_fields, list) else [pdf_fields]:
+        spec = specs.get(name)
+        if spec is not None:
+            issues.extend(issue for issue in check_value(spec, text) if issue not in issues)
+    return issues
+
+
+def _row_issues(row, record):
+    raw_dob = row.get("DateOfBirth", "").strip()
+    if raw_dob and not record["dd"]:
+        yield "ERROR", f"DateOfBirth {raw_dob!r} is not a date; the DOB boxes stay blank"
+    elif not raw_dob:
+        yield "WARNING", "no DateOfBirth"
+    if not record["name"].strip():
+        yield "WARNING", "no AttendeeName"
+
+
+def _label(profile):
+    if "group" not in profile:
+        return profile["name"]
+    _, facility, session = profile["group"]
+    where = facility or "unknown facility"
+    if session:
+        where += f", session {session}"
+    return f"{profile['name']} @ {where}"
+
+
+def check_roster(courses, input_csv=INPUT_CSV, route=False):
+    """Checks a roster against the listed courses; returns (issues, notes).
+
+    issues is a list of (level, where, message): the roster rows first,
+    then each course's template, host block and slots in batch order.
+    notes has one line per course (per group with route=True). With
+    route=True, rows no course claims are listed instead of checked.
+    """
+    rows = read_rows(input_csv)
+    records = normalize_rows(rows)
+    row_numbers = {id(record): index + 2 for index, record in enumerate(records)}  # after the header
+
+    profiles = [load_profile(course) for course in courses]
+    stats = {}
+    if route:
+        facilities = load_facilities()
+        jobs = list(route_jobs(profiles, [records], facilities, stats))
+        routed = {id(record) for _, batch, _ in jobs for record in batch}
+    else:
+        jobs = iter_jobs(profiles, [records], stats)
+        routed = None
+
+    issues = []
+    skipped = {}
+    for row, record in zip(rows, records):
+        if routed is not None and id(record) not in routed:
+            skipped.setdefault(record["calendar"], []).append(row_numbers[id(record)])
+            continue
+        where = f"row {row_numbers[id(record)]} ({record['name'] or 'no name'})"
+        issues.extend((level, where, message) for level, message in _row_issues(row, record))
+
+    specs = {}
+    for profile in profiles:
+        template = profile["template"]
+        if not os.path.exists(template):
+            issues.append(("ERROR", profile["name"], f"could not find {template}"))
+            continue
+        specs[template] = field_specs(template)
+        missing = [name for name in dict.fromkeys(profile_field_names(profile))
+                   if name not in specs[template]
+                   and name not in load_inventory(template)["fields"]]
+        if missing:
+            issues.append(("WARNING", profile["name"],
+                           f"the template has no field(s) {', '.join(missing)}; they stay blank"))
+
+    hosts_checked = set()
+    for profile, batch, batch_num in jobs:
+        template_specs = specs.get(profile["template"])
+        if template_specs is None:
+            continue
+        label = _label(profile)
+        if label not in hosts_checked:
+            hosts_checked.add(label)
+            for pdf_field, text in host_data_map(profile).items():
+                for level, message in _field_issues(template_specs, pdf_field, text):
+                    issues.append((level, f"{label} host block ({pdf_field})", message))
+        for slot_num, (slot, record) in enumerate(zip(profile["slots"], batch), start=1):
+            for key, pdf_fields in slot.items():
+                text = record.get(key, "")
+                for level, message in _field_issues(template_specs, pdf_fields, text):
+                    where = (f"{label} sheet {batch_num} slot {slot_num} "
+                             f"(row {row_numbers[id(record)]}, {_LABELS.get(key, key)})")
+                    issues.append((level, where, f"{message} ({text!r})"))
+
+    notes = []
+    names = {profile["course"]: profile for profile in profiles}
+    for key, (candidates, batches) in sorted(stats.items()):
+        # Routed stats are keyed by group (course, facility, session).
+        profile = {**names[key[0]], "group": key} if route else names[key]
+        notes.append(f"{_label(profile)}: {candidates} candidates -> {batches} sheet(s) "
+                     f"of {profile['batch_size']} slots")
+    for calendar_name, row_nums in sorted(skipped.items()):
+        listed = ", ".join(map(str, row_nums[:_LISTED_ROWS]))
+        if len(row_nums) > _LISTED_ROWS:
+            listed += f" and {len(row_nums) - _LISTED_ROWS} more"
+        issues.append(("WARNING", f"CalendarName '{calendar_name}'",
+                       f"{len(row_nums)} row(s) skipped and not checked, no profile lists it "
+                       f"({'row' if len(row_nums) == 1 else 'rows'} {listed})"))
+    if route:
+        for facility, groups in sorted(unmatched_facilities(stats, facilities).items()):
+            issues.append(("WARNING", f"facility '{facility or 'unknown facility'}'",
+                           f"no facilities/*.json matches it; its {groups} group(s) get the course "
+                           f"host block with the facility fields from the roster"))
+    return issues, notes
+
+
+def run_check(courses, input_csv=INPUT_CSV, route=False):
+    """Prints every issue check_roster() finds; returns the number of errors."""
+    print(f"Checking {input_csv} (no PDFs are written)...")
+    if not os.path.exists(input_csv):
+        print(f"ERROR: {input_csv} not found.")
+        return 1
+    start = time.perf_counter()
+    issues, notes = check_roster(courses, input_csv, route)
+    elapsed = time.perf_counter() - start
+
+    for note in notes:
+        print(note)
+    for level, where, message in issues:
+        print(f"{level + ':':8} {where}: {message}")
+    errors = sum(level == "ERROR" for level, _, _ in issues)
+    warnings = len(issues) - errors
+    print(f"{errors} error(s), {warnings} warning(s) in {elapsed * 1000:.0f}ms "
+          f"(text sized down to {MIN_FONT_SIZE:g}pt before it counts as cut off).")
+    return errors
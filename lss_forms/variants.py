@@ -0,0 +1,37 @@
+"""Host variants: templates with a host block already filled in.
+
+The host & facility fields (Text19-Text29 on the Bronze forms, "Host
+Name", "Facility Name" and so on on SFA/EFA) hold the same values on every
+sheet of a course at one facility. A variant is a copy of the template
+with those fields written once; batches are copied from it and only write
+their candidates. Routed runs get one variant per facility host block
+(see routing.py), each built on first use and kept warm for the process.
+"""
+from lss_forms import instrument
+from lss_forms.appearance import appearance_plans
+from lss_forms.fields import field_index, write_fields
+from lss_forms.manifest import file_hash
+from lss_forms.templates import clone_template
+
+# --- CACHE ---
+# Keyed by (template path, template sha256, host values, incremental): the
+# pre-filled writer, which like a cached template is never filled or written itself.
+_VARIANTS = {}
+
+
+def host_variant(template, host_map, incremental=False):
+    """The template with host_map ({PDF field: value}) written in."""
+    key = (template, file_hash(template), tuple(sorted(host_map.items())), incremental)
+    variant = _VARIANTS.get(key)
+    if variant is None:
+        with instrument.stage("variant"):
+            variant = clone_template(template, incremental)
+            write_fields(variant, field_index(template, incremental), host_map,
+                         appearance_plans(template, incremental))
+        _VARIANTS[key] = variant
+    return variant
+
+
+def clear_variants():
+    """Drops every cached variant (e.g. after a host block was edited)."""
+    _VARIANTS.clear()
@@ -0,0 +1,98 @@
+"""Watch mode: refill sheets whenever the roster file changes.
+
+    python -m lss_forms --watch                 # every course, roster.csv
+    python -m lss_forms --watch --route sfa
+
+Registration week means re-exporting roster.csv over and over. Here one
+long-running process polls the file and, once it has stopped changing
+for DEBOUNCE_SECONDS (exports are written in several steps), reruns the
+fill with --incremental: the manifest (manifest.py) skips every batch
+whose candidates, host block and template are unchanged, so only the
+courses and sheets the new rows touch are refilled, and removed sheets
+are deleted. Templates, host variants, appearance plans and the roster
+parsing caches stay warm between runs, so a rerun costs the changed
+sheets and little else. Sheets are replaced atomically (see sinks.py).
+
+Each run reports its latency: from the roster's last modification to the
+updated PDFs being on disk, debounce included.
+"""
+import os
+import time
+
+from lss_forms.engine import run_courses
+from lss_forms.manifest import file_hash
+
+# --- CONFIGURATION ---
+# How often the roster is looked at.
+POLL_SECONDS = 0.25
+# How long the roster must stay unchanged before a run starts.
+DEBOUNCE_SECONDS = 1.0
+
+
+def _state(path):
+    # (size, mtime) of the roster, or None while it is missing (some
+    # exporters delete the old file before writing the new one).
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def wait_for_change(path, state, poll=POLL_SECONDS, debounce=DEBOUNCE_SECONDS):
+    """Blocks until path differs from state and then holds still for debounce
+    seconds; returns the new state."""
+    while _state(path) == state:
+        time.sleep(poll)
+    state = _state(path)
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(poll)
+        current = _state(path)
+        if current != state:
+            state, quiet_since = current, time.monotonic()
+    return state
+
+
+def watch(courses, input_csv, output_folder, route=False, flatten=False, append=False,
+          poll=POLL_SECONDS, debounce=DEBOUNCE_SECONDS, runs=None):
+    """Fills the courses now, then again after every change to input_csv.
+
+    Runs until interrupted (or after runs fills, counting the first).
+    A run that fails, e.g. on a half-written export, is reported and the
+    next change is waited for.
+    """
+    print(f"Watching {input_csv} (Ctrl+C to stop)...")
+    state = _state(input_csv)
+    digest = None
+    done = 0
+    try:
+        while runs is None or done < runs:
+            if done:
+                state = wait_for_change(input_csv, state, poll, debounce)
+                if state is None:
+                    print(f"WARNING: {input_csv} disappeared; waiting for it to come back.")
+                    continue
+                if file_hash(input_csv) == digest:
+                    print(f"{input_csv} touched but unchanged; nothing to do.")
+                    continue
+            done += 1
+            # Hashed before the run: a change during it is picked up next.
+            digest = file_hash(input_csv) if state is not None else None
+            start = time.perf_counter()
+            try:
+                written = run_courses(courses, input_csv, output_folder, route=route,
+                                      incremental=True, flatten=flatten, append=append)
+            except Exception as e:
+                print(f"ERROR: run failed ({type(e).__name__}: {e}); waiting for the next change.")
+                digest = None
+                continue
+            took = time.perf_counter() - start
+            if done == 1 or state is None:
+                print(f"Updated {len(written)} sheet(s) in {took:.2f}s.")
+            else:
+                latency = time.time() - state[1] / 1e9
+                print(f"Updated {len(written)} sheet(s) in {took:.2f}s; "
+                      f"{latency:.2f}s after the roster changed (debounce {debounce:g}s).")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -0,0 +1,47 @@
+"""NeedAppearances is raised for any sheet with a value pypdf had to draw."""
+import io
+import os
+
+import pytest
+from pypdf import PdfReader
+
+from lss_forms.engine import batch_pdf, load_profile
+from lss_forms.fields import _widget_field, qualified_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # Profiles and templates are found relative to the repository root.
+    monkeypatch.chdir(ROOT)
+
+
+def fill_name(course, name):
+    """(NeedAppearances, /V, appearance stream) of slot 1's name field."""
+    profile = load_profile(course)
+    reader = PdfReader(io.BytesIO(batch_pdf(profile, [{"name": name}])))
+    need_appearances = reader.trailer["/Root"]["/AcroForm"].get("/NeedAppearances")
+    for annot in reader.pages[0]["/Annots"]:
+        annotation = annot.get_object()
+        field = _widget_field(annotation)
+        if qualified_name(field) == profile["slots"][0]["name"]:
+            return need_appearances, field["/V"], annotation["/AP"]["/N"].get_data()
+    raise AssertionError("slot 1 has no name widget")
+
+
+@pytest.mark.parametrize("course", ["bronze_cross", "efa", "sfa"])
+def test_unencodable_name_asks_viewers_to_redraw(course):
+    need_appearances, value, stream = fill_name(course, "Юлия Chan")
+    assert value == "Юлия Chan"
+    # pypdf's fallback drawing: the glyphs /Helv cannot encode become "?".
+    assert b"(???? Chan) Tj" in stream
+    assert need_appearances == True  # noqa: E712 (BooleanObject)
+
+
+@pytest.mark.parametrize("course", ["bronze_cross", "efa", "sfa"])
+def test_drawable_name_keeps_own_appearance(course):
+    need_appearances, value, stream = fill_name(course, "Lukasz Chan")
+    assert value == "Lukasz Chan"
+    assert b"(Lukasz Chan) Tj" in stream
+    assert need_appearances == False  # noqa: E712 (BooleanObject)